@@ -4,7 +4,7 @@
     'category': '',
     'version': '18.0.0.1.0',  # recommended Odoo version format ( 18.0.0 odooVersion and 1.0 app version )
     'depends': [
-        'base','sale_management','account','mail','contacts'
+        'base','sale_management','account','mail','contacts','sequence_block'
     ],
     'data': [
         # add your XML files here later (paths)
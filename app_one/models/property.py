@@ -137,12 +137,14 @@ class Property(models.Model):
             ('postcode', '=', '12345')
         ]))
 
-    @api.model
-    def create(self, vals):
-        res = super(Property,self).create(vals)
-        if res.ref == 'New':
-          res.ref =  self.env['ir.sequence'].next_by_code('property_seq')
-        return res
+    @api.model_create_multi
+    def create(self, vals_list):
+        # refs are set before the INSERT, one sequence block for the whole batch
+        new_vals = [vals for vals in vals_list if vals.get('ref', 'New') == 'New']
+        refs = self.env['ir.sequence'].sudo()._next_block_by_code('property_seq', len(new_vals))
+        for vals, ref in zip(new_vals, refs):
+            vals['ref'] = ref
+        return super(Property,self).create(vals_list)
 
     def create_history_record(self,old_state,new_state,reason):
         for rec in self:
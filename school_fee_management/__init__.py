@@ -1 +1,5 @@
-from . import models
\ No newline at end of file
+# -*- coding: utf-8 -*-
+
+from . import controllers
+from . import models
+from . import wizard
@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 {
     'name': 'School Fee Management',
-    'version': '18.0.1.0.0',
+    'version': '18.0.1.1.0',
     'category': 'Education',
     'summary': 'Manage student fees, invoices, and payments with parent portal',
     'description': """
@@ -21,6 +21,7 @@
         'base',
         'account',  # Odoo Invoicing module
         'mail',  # For message tracking and audit trail
+        'sequence_block',  # Block reservation of transaction references
     ],
     'data': [
         # Security
@@ -31,18 +32,27 @@
         # Data
         'data/fee_type_data.xml',
         'data/cron_jobs.xml',
+        'data/discuss_channel_data.xml',
         'data/demo_data.xml',
 
         # Views
+        'views/audit_log_views.xml',
         'views/fee_structure_views.xml',
         'views/student_invoice_views.xml',
         'views/payment_transaction_views.xml',
         'views/parent_portal_views.xml',
+        'views/invoice_generation_job_views.xml',
+        'views/fee_billing_period_views.xml',
+        'views/res_partner_views.xml',
+        'wizard/payment_import_views.xml',
+        'wizard/archive_academic_year_views.xml',
         'views/menu_items.xml',
 
         # Reports
         'reports/outstanding_payments_report.xml',
         'reports/revenue_summary_report.xml',
+        'reports/payment_collection_report.xml',
+        'views/academic_year_history_views.xml',
     ],
     'demo': [
         'data/demo_data.xml',
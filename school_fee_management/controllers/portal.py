@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+
+from odoo import http, fields
+from odoo.http import request
+from datetime import date
+import hashlib
+
+# Default and maximum number of rows returned per page
+PORTAL_PAGE_SIZE = 20
+PORTAL_MAX_PAGE_SIZE = 200
+
+
+class SchoolFeePortal(http.Controller):
+    """
+    Lean JSON API for the parent portal.
+
+    PERFORMANCE OPTIMIZATION:
+    - Reads only stored, denormalized columns with plain SQL: no computed
+      fields, no mail.thread followers, no record rule evaluation
+    - Keyset pagination on (date, id): every page is one index range scan,
+      whatever its depth, instead of an OFFSET that rescans previous pages
+    - Conditional caching: the ETag is derived from the max write_date and
+      row count of the parent's rows, and an unchanged page answers 304
+
+    SECURITY NOTE:
+    - The parent filter (parent_id = user's partner) is the same condition
+      as the parent record rules and is always applied in the WHERE clause
+    """
+
+    def _check_parent_access(self):
+        if not request.env.user.has_group('school_fee_management.group_school_parent'):
+            raise request.not_found()
+        return request.env.user.partner_id.id
+
+    def _parse_page_args(self, limit, after_date, after_id):
+        try:
+            limit = min(max(int(limit), 1), PORTAL_MAX_PAGE_SIZE)
+            after_id = int(after_id) if after_id else None
+            after_date = fields.Date.to_date(after_date) if after_date else None
+        except ValueError:
+            raise request.not_found()
+        return limit, after_date, after_id
+
+    def _etag(self, *parts):
+        return '"%s"' % hashlib.sha1(':'.join(map(str, parts)).encode()).hexdigest()
+
+    def _json_page(self, rows, columns, date_key, etag):
+        records = []
+        for row in rows:
+            record = dict(zip(columns, row))
+            for key, value in record.items():
+                if isinstance(value, date):
+                    record[key] = fields.Date.to_string(value)
+            records.append(record)
+        next_cursor = None
+        if records:
+            next_cursor = {'after_date': records[-1][date_key], 'after_id': records[-1]['id']}
+        return request.make_json_response(
+            {'records': records, 'next_cursor': next_cursor},
+            headers=[('ETag', etag), ('Cache-Control', 'private, no-cache')],
+        )
+
+    def _not_modified(self, etag):
+        if request.httprequest.headers.get('If-None-Match') == etag:
+            return request.make_response('', status=304, headers=[('ETag', etag)])
+        return None
+
+    def _pdf_response(self, record):
+        """
+        Serve the cached PDF of `record` (a school.pdf.cache.mixin record
+        already checked against the parent). The cache key doubles as ETag.
+        """
+        record = record.sudo()
+        attachment = record._get_cached_pdf()
+        etag = '"%s"' % record.pdf_cache_key
+        not_modified = self._not_modified(etag)
+        if not_modified:
+            return not_modified
+        return request.make_response(attachment.raw, headers=[
+            ('Content-Type', 'application/pdf'),
+            ('Content-Disposition', http.content_disposition(attachment.name)),
+            ('ETag', etag),
+            ('Cache-Control', 'private, no-cache'),
+        ])
+
+    @http.route('/school_fee/portal/summary', type='http', auth='user', methods=['GET'])
+    def portal_summary(self, **kwargs):
+        """
+        Balance summary of the logged-in parent for the portal landing page.
+        The summary is stored on the parent row: one primary key lookup.
+        """
+        parent_id = self._check_parent_access()
+        request.env['res.partner'].browse(parent_id).flush_recordset([
+            'children_total_outstanding', 'children_overdue_amount',
+            'children_next_due_date', 'children_last_payment_date',
+        ])
+        cr = request.env.cr
+        columns = ['id', 'outstanding', 'overdue_amount', 'next_due_date', 'last_payment_date']
+        cr.execute("""
+            SELECT id, children_total_outstanding, children_overdue_amount,
+                   children_next_due_date, children_last_payment_date
+              FROM res_partner
+             WHERE id = %s
+        """, [parent_id])
+        row = cr.fetchone()
+        etag = self._etag('summary', *row)
+        not_modified = self._not_modified(etag)
+        if not_modified:
+            return not_modified
+        summary = {
+            key: fields.Date.to_string(value) if isinstance(value, date) else value
+            for key, value in zip(columns, row)
+        }
+        return request.make_json_response(
+            summary, headers=[('ETag', etag), ('Cache-Control', 'private, no-cache')]
+        )
+
+    @http.route('/school_fee/portal/invoices', type='http', auth='user', methods=['GET'])
+    def portal_invoices(self, limit=PORTAL_PAGE_SIZE, after_date=None, after_id=None, **kwargs):
+        """
+        Children's invoices of the logged-in parent, newest first.
+        Pass `after_date` and `after_id` from `next_cursor` to get the next page.
+        """
+        parent_id = self._check_parent_access()
+        limit, after_date, after_id = self._parse_page_args(limit, after_date, after_id)
+        cr = request.env.cr
+
+        cr.execute("""
+            SELECT MAX(write_date), COUNT(*)
+              FROM school_student_invoice
+             WHERE parent_id = %s
+        """, [parent_id])
+        last_write, count = cr.fetchone()
+        # Today is part of the key: overdue days change with the date
+        etag = self._etag('invoices', parent_id, last_write, count, fields.Date.today(), limit, after_date, after_id)
+        not_modified = self._not_modified(etag)
+        if not_modified:
+            return not_modified
+
+        keyset = ''
+        params = [parent_id]
+        if after_date and after_id:
+            keyset = 'AND (inv.invoice_date, inv.id) < (%s, %s)'
+            params += [after_date, after_id]
+        params.append(limit)
+
+        columns = [
+            'id', 'display_name', 'student_id', 'student_name', 'semester', 'academic_year',
+            'invoice_date', 'due_date', 'amount_total', 'amount_residual', 'currency',
+            'payment_percentage', 'state', 'is_overdue', 'days_overdue', 'aging_bucket',
+        ]
+        cr.execute("""
+            SELECT inv.id, inv.display_name, inv.student_id, student.name, inv.semester, inv.academic_year,
+                   inv.invoice_date, inv.due_date, inv.amount_total, inv.amount_residual, currency.name,
+                   inv.payment_percentage, inv.state, inv.is_overdue, inv.days_overdue, inv.aging_bucket
+              FROM school_student_invoice inv
+              JOIN res_partner student ON student.id = inv.student_id
+         LEFT JOIN res_currency currency ON currency.id = inv.currency_id
+             WHERE inv.parent_id = %s
+               AND inv.invoice_date IS NOT NULL
+               {keyset}
+          ORDER BY inv.invoice_date DESC, inv.id DESC
+             LIMIT %s
+        """.format(keyset=keyset), params)
+        return self._json_page(cr.fetchall(), columns, 'invoice_date', etag)
+
+    @http.route('/school_fee/portal/payments', type='http', auth='user', methods=['GET'])
+    def portal_payments(self, limit=PORTAL_PAGE_SIZE, after_date=None, after_id=None, **kwargs):
+        """
+        Payment history of the logged-in parent's children, newest first.
+        Pass `after_date` and `after_id` from `next_cursor` to get the next page.
+        """
+        parent_id = self._check_parent_access()
+        limit, after_date, after_id = self._parse_page_args(limit, after_date, after_id)
+        cr = request.env.cr
+
+        cr.execute("""
+            SELECT MAX(pay.write_date), COUNT(*)
+              FROM school_payment_transaction pay
+              JOIN school_student_invoice inv ON inv.id = pay.student_invoice_id
+             WHERE inv.parent_id = %s
+        """, [parent_id])
+        last_write, count = cr.fetchone()
+        etag = self._etag('payments', parent_id, last_write, count, limit, after_date, after_id)
+        not_modified = self._not_modified(etag)
+        if not_modified:
+            return not_modified
+
+        keyset = ''
+        params = [parent_id]
+        if after_date and after_id:
+            keyset = 'AND (pay.payment_date, pay.id) < (%s, %s)'
+            params += [after_date, after_id]
+        params.append(limit)
+
+        columns = [
+            'id', 'name', 'student_invoice_id', 'student_id', 'student_name', 'payment_date',
+            'amount', 'currency', 'payment_method', 'payment_reference', 'state',
+        ]
+        cr.execute("""
+            SELECT pay.id, pay.name, pay.student_invoice_id, pay.student_id, student.name, pay.payment_date,
+                   pay.amount, currency.name, pay.payment_method, pay.payment_reference, pay.state
+              FROM school_payment_transaction pay
+              JOIN school_student_invoice inv ON inv.id = pay.student_invoice_id
+              JOIN res_partner student ON student.id = pay.student_id
+         LEFT JOIN res_currency currency ON currency.id = pay.currency_id
+             WHERE inv.parent_id = %s
+               {keyset}
+          ORDER BY pay.payment_date DESC, pay.id DESC
+             LIMIT %s
+        """.format(keyset=keyset), params)
+        return self._json_page(cr.fetchall(), columns, 'payment_date', etag)
+
+    @http.route('/school_fee/portal/invoices/<int:invoice_id>/pdf', type='http', auth='user', methods=['GET'])
+    def portal_invoice_pdf(self, invoice_id, **kwargs):
+        """
+        PDF of one of the parent's invoices, served from the attachment cache:
+        wkhtmltopdf only runs when the accounting invoice changed.
+        """
+        parent_id = self._check_parent_access()
+        invoice = request.env['school.student.invoice'].sudo().browse(invoice_id).exists()
+        if not invoice or invoice.parent_id.id != parent_id or invoice.invoice_id.state != 'posted':
+            raise request.not_found()
+        return self._pdf_response(invoice)
+
+    @http.route('/school_fee/portal/payments/<int:transaction_id>/pdf', type='http', auth='user', methods=['GET'])
+    def portal_payment_pdf(self, transaction_id, **kwargs):
+        """Receipt of one of the parent's reconciled payments, served from the attachment cache"""
+        parent_id = self._check_parent_access()
+        transaction = request.env['school.payment.transaction'].sudo().browse(transaction_id).exists()
+        if (not transaction or transaction.student_invoice_id.parent_id.id != parent_id
+                or not transaction.account_payment_id):
+            raise request.not_found()
+        return self._pdf_response(transaction)
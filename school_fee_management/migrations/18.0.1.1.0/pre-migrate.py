@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+def migrate(cr, version):
+    """
+    Cancel duplicate semester invoices before the idempotency index is built.
+
+    StudentInvoice.init() creates a unique index on (student_id, semester,
+    academic_year) for non-cancelled invoices, which fails on databases
+    where a re-run generation cron created duplicates. Per student, semester
+    and academic year, the invoice with the most paid amount is kept (the
+    oldest one on ties); the others are cancelled and reported in the log.
+    Their accounting invoices are left untouched, to be reversed by an
+    accountant.
+    """
+    if not version:
+        return
+    cr.execute("""
+        SELECT 1 FROM pg_indexes WHERE indexname = 'school_student_invoice_semester_unique'
+    """)
+    if cr.fetchone():
+        return
+
+    cr.execute("""
+        WITH ranked AS (
+            SELECT id,
+                   ROW_NUMBER() OVER (
+                       PARTITION BY student_id, semester, academic_year
+                           ORDER BY COALESCE(amount_total, 0) - COALESCE(amount_residual, 0) DESC, id
+                   ) AS rank
+              FROM school_student_invoice
+             WHERE state != 'cancelled'
+               AND semester IS NOT NULL
+        )
+        UPDATE school_student_invoice inv
+           SET state = 'cancelled',
+               write_date = NOW() AT TIME ZONE 'UTC'
+          FROM ranked
+         WHERE inv.id = ranked.id
+           AND ranked.rank > 1
+     RETURNING inv.id, inv.invoice_id, inv.student_id, inv.semester, inv.academic_year
+    """)
+    for invoice_id, move_id, student_id, semester, academic_year in cr.fetchall():
+        _logger.warning(
+            f'Cancelled duplicate student invoice {invoice_id} (student {student_id}, '
+            f'{semester} {academic_year}); review its accounting invoice {move_id}'
+        )
@@ -1,7 +1,14 @@
 # -*- coding: utf-8 -*-
 
+from . import pdf_cache_mixin
+from . import audit_log
 from . import fee_structure
+from . import fee_billing_period
 from . import student_invoice
 from . import payment_transaction
 from . import res_partner
 from . import account_move
+from . import invoice_generation_job
+from . import academic_year_history
+from . import payment_collection
+from . import revenue_summary
@@ -0,0 +1,344 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError
+from odoo.tools import SQL, split_every
+import logging
+import time
+
+_logger = logging.getLogger(__name__)
+
+# Invoices moved to the history tables per statement
+ARCHIVE_BATCH_SIZE = 5000
+
+
+class StudentInvoiceHistory(models.Model):
+    """
+    Cold storage of the student invoices of closed academic years.
+
+    WHY?
+    - school.student.invoice and school.payment.transaction grow every
+      semester; their indexes, the default ordering and the portal queries
+      pay for the whole history
+    - Paid and cancelled invoices of a closed year are moved here, with
+      their payments: the hot tables only hold the years still worked on
+    - History stays queryable: these tables have their own list and pivot
+      views and are part of the revenue summary
+
+    OPTIMIZATION:
+    - Plain stored columns, no mail.thread, no computed fields
+    - (academic_year, invoice_date) index: history is read per year
+    - Rows are moved with DELETE ... RETURNING / INSERT statements, one
+      pair per batch of invoices; their school.audit.log entries are
+      rewritten to the history model and ids in one UPDATE
+    """
+    _name = 'school.student.invoice.history'
+    _description = 'Archived Student Invoice'
+    _order = 'invoice_date desc, id desc'
+
+    original_id = fields.Integer(string='Original ID', readonly=True, index=True)
+    name = fields.Char(string='Name', readonly=True)
+    student_id = fields.Many2one('res.partner', string='Student', readonly=True, index=True, ondelete='set null')
+    parent_id = fields.Many2one('res.partner', string='Parent', readonly=True, ondelete='set null')
+    invoice_id = fields.Many2one('account.move', string='Invoice', readonly=True, ondelete='set null')
+
+    grade_level = fields.Selection(
+        selection=lambda self: self.env['res.partner']._fields['grade_level'].selection,
+        string='Grade Level',
+        readonly=True
+    )
+
+    semester = fields.Selection([
+        ('fall', 'Fall'),
+        ('spring', 'Spring'),
+        ('summer', 'Summer'),
+    ], string='Semester', readonly=True)
+
+    academic_year = fields.Char(string='Academic Year', readonly=True)
+    billing_period_start = fields.Date(string='Billing Period', readonly=True)
+    invoice_date = fields.Date(string='Invoice Date', readonly=True)
+    due_date = fields.Date(string='Due Date', readonly=True)
+    amount_total = fields.Monetary(string='Total Amount', readonly=True)
+    amount_residual = fields.Monetary(string='Amount Due', readonly=True)
+    currency_id = fields.Many2one('res.currency', string='Currency', readonly=True)
+
+    state = fields.Selection([
+        ('paid', 'Paid'),
+        ('cancelled', 'Cancelled'),
+    ], string='Status', readonly=True)
+
+    archive_date = fields.Datetime(string='Archived On', readonly=True)
+
+    transaction_ids = fields.One2many(
+        'school.payment.transaction.history',
+        'student_invoice_history_id',
+        string='Payment Transactions'
+    )
+
+    def init(self):
+        # INDEX: History is read one academic year at a time
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS school_student_invoice_history_year_idx
+                ON school_student_invoice_history (academic_year, invoice_date)
+        """)
+
+    @api.model
+    def _get_archivable_invoice_ids(self, academic_year):
+        """
+        Closed invoices of an academic year: paid or cancelled, without any
+        draft or confirmed payment still being processed.
+        """
+        self.env.flush_all()
+        self.env.cr.execute("""
+            SELECT inv.id
+              FROM school_student_invoice inv
+             WHERE inv.academic_year = %s
+               AND inv.state IN ('paid', 'cancelled')
+               AND NOT EXISTS (
+                       SELECT 1
+                         FROM school_payment_transaction pay
+                        WHERE pay.student_invoice_id = inv.id
+                          AND pay.state IN ('draft', 'confirmed'))
+          ORDER BY inv.id
+        """, [academic_year])
+        return [row[0] for row in self.env.cr.fetchall()]
+
+    @api.model
+    def _check_academic_year_closed(self, academic_year):
+        """
+        Refuse to archive a year still worked on: unfinished generation
+        jobs, open or unpaid invoices, or payments still being processed.
+        An invoice is unpaid while its accounting invoice has a residual
+        amount, whatever its school status says.
+        """
+        reasons = []
+        job_count = self.env['school.invoice.generation.job'].search_count([
+            ('academic_year', '=', academic_year),
+            ('state', 'in', ['pending', 'running', 'failed']),
+        ])
+        if job_count:
+            reasons.append(_('%s unfinished invoice generation job(s)') % job_count)
+
+        # The residual is read from the move: the student invoice copy may
+        # not be refreshed yet (see StudentInvoice._mark_moves_dirty)
+        self.env.flush_all()
+        self.env.cr.execute("""
+            SELECT COUNT(*)
+              FROM school_student_invoice inv
+              LEFT JOIN account_move move ON move.id = inv.invoice_id
+             WHERE inv.academic_year = %s
+               AND (inv.state NOT IN ('paid', 'cancelled')
+                    OR (inv.state = 'paid' AND COALESCE(move.amount_residual, inv.amount_residual) > 0))
+        """, [academic_year])
+        open_count = self.env.cr.fetchone()[0]
+        if open_count:
+            reasons.append(_('%s open or unpaid invoice(s)') % open_count)
+
+        self.env.cr.execute("""
+            SELECT COUNT(*)
+              FROM school_payment_transaction pay
+              JOIN school_student_invoice inv ON inv.id = pay.student_invoice_id
+             WHERE inv.academic_year = %s
+               AND pay.state IN ('draft', 'confirmed')
+        """, [academic_year])
+        pending_count = self.env.cr.fetchone()[0]
+        if pending_count:
+            reasons.append(_('%s pending payment(s)') % pending_count)
+
+        if reasons:
+            raise UserError(_(
+                'Academic year %(year)s is not closed yet: %(reasons)s.',
+                year=academic_year, reasons=', '.join(reasons),
+            ))
+
+    @api.model
+    def _archive_academic_year(self, academic_year, batch_size=ARCHIVE_BATCH_SIZE):
+        """
+        Move the closed invoices of `academic_year` and their payments to
+        the history tables. The year must be closed
+        (see _check_academic_year_closed).
+
+        Returns:
+            dict with the invoice and transaction counts and the duration
+        """
+        started_at = time.perf_counter()
+        self._check_academic_year_closed(academic_year)
+        # Archived amounts must include the payments of this transaction
+        self.env['school.student.invoice']._sync_dirty_moves()
+        invoice_ids = self._get_archivable_invoice_ids(academic_year)
+        stats = {'invoices': 0, 'transactions': 0}
+        if not invoice_ids:
+            stats['duration'] = time.perf_counter() - started_at
+            return stats
+
+        cr = self.env.cr
+        affected_partner_ids = set()
+        for ids in split_every(batch_size, invoice_ids, list):
+            cr.execute("""
+                SELECT student_id, parent_id FROM school_student_invoice WHERE id = ANY(%s)
+            """, [ids])
+            for student_id, parent_id in cr.fetchall():
+                affected_partner_ids.update(filter(None, (student_id, parent_id)))
+
+            cr.execute("""
+                SELECT id FROM school_payment_transaction WHERE student_invoice_id = ANY(%s)
+            """, [ids])
+            transaction_ids = [row[0] for row in cr.fetchall()]
+
+            # Cached PDFs, chatter, followers and activities of the moved records
+            self.env['ir.attachment'].sudo().search([
+                '|',
+                '&', ('res_model', '=', 'school.student.invoice'), ('res_id', 'in', ids),
+                '&', ('res_model', '=', 'school.payment.transaction'), ('res_id', 'in', transaction_ids),
+            ]).unlink()
+            for table, model_column in (('mail_message', 'model'),
+                                        ('mail_followers', 'res_model'),
+                                        ('mail_activity', 'res_model')):
+                cr.execute(SQL("""
+                    DELETE FROM %(table)s
+                     WHERE (%(model_column)s = 'school.student.invoice' AND res_id = ANY(%(ids)s))
+                        OR (%(model_column)s = 'school.payment.transaction' AND res_id = ANY(%(transaction_ids)s))
+                """, table=SQL.identifier(table), model_column=SQL.identifier(model_column),
+                    ids=ids, transaction_ids=transaction_ids))
+
+            # The accounting invoices stay, no longer linked to a live student invoice
+            cr.execute("""
+                UPDATE account_move
+                   SET student_invoice_id = NULL,
+                       is_school_invoice = FALSE
+                 WHERE student_invoice_id = ANY(%s)
+            """, [ids])
+
+            # Payments first: they are deleted in cascade with their invoice
+            cr.execute("""
+                WITH moved AS (
+                    DELETE FROM school_payment_transaction
+                     WHERE student_invoice_id = ANY(%(ids)s)
+                 RETURNING *
+                )
+                INSERT INTO school_payment_transaction_history
+                       (original_id, name, student_invoice_original_id, student_id, invoice_id,
+                        payment_date, amount, currency_id, payment_method, payment_reference,
+                        state, account_payment_id, academic_year,
+                        create_uid, create_date, write_uid, write_date)
+                SELECT moved.id, moved.name, moved.student_invoice_id, moved.student_id, moved.invoice_id,
+                       moved.payment_date, moved.amount, moved.currency_id, moved.payment_method,
+                       moved.payment_reference, moved.state, moved.account_payment_id, %(academic_year)s,
+                       %(uid)s, NOW() AT TIME ZONE 'UTC', %(uid)s, NOW() AT TIME ZONE 'UTC'
+                  FROM moved
+            """, {'ids': ids, 'academic_year': academic_year, 'uid': self.env.uid})
+            stats['transactions'] += cr.rowcount
+
+            cr.execute("""
+                WITH moved AS (
+                    DELETE FROM school_student_invoice
+                     WHERE id = ANY(%(ids)s)
+                 RETURNING *
+                )
+                INSERT INTO school_student_invoice_history
+                       (original_id, name, student_id, parent_id, invoice_id, grade_level,
+                        semester, academic_year, billing_period_start, invoice_date, due_date,
+                        amount_total, amount_residual, currency_id, state, archive_date,
+                        create_uid, create_date, write_uid, write_date)
+                SELECT moved.id, moved.display_name, moved.student_id, moved.parent_id, moved.invoice_id,
+                       moved.grade_level, moved.semester, moved.academic_year, moved.billing_period_start,
+                       moved.invoice_date, moved.due_date, moved.amount_total, moved.amount_residual,
+                       moved.currency_id, moved.state, NOW() AT TIME ZONE 'UTC',
+                       %(uid)s, NOW() AT TIME ZONE 'UTC', %(uid)s, NOW() AT TIME ZONE 'UTC'
+                  FROM moved
+            """, {'ids': ids, 'uid': self.env.uid})
+            stats['invoices'] += cr.rowcount
+
+            # Audit entries follow their record to the history tables
+            for model, history_model, moved_ids in (
+                    ('school.student.invoice', 'school.student.invoice.history', ids),
+                    ('school.payment.transaction', 'school.payment.transaction.history', transaction_ids)):
+                cr.execute(SQL("""
+                    UPDATE school_audit_log log
+                       SET model = %(history_model)s,
+                           res_id = history.id
+                      FROM %(history_table)s history
+                     WHERE log.model = %(model)s
+                       AND log.res_id = history.original_id
+                       AND history.original_id = ANY(%(moved_ids)s)
+                """, history_table=SQL.identifier(self.env[history_model]._table),
+                    model=model, history_model=history_model, moved_ids=moved_ids))
+
+            cr.execute("""
+                UPDATE school_payment_transaction_history pay
+                   SET student_invoice_history_id = inv.id,
+                       grade_level = inv.grade_level
+                  FROM school_student_invoice_history inv
+                 WHERE inv.original_id = pay.student_invoice_original_id
+                   AND pay.student_invoice_history_id IS NULL
+                   AND pay.student_invoice_original_id = ANY(%s)
+            """, [ids])
+
+        self.env.invalidate_all()
+        # Parent summaries read the payment history of the hot tables
+        partners = self.env['res.partner'].browse(affected_partner_ids)
+        Partner = self.env['res.partner']
+        for fname in ('total_outstanding', 'children_total_outstanding', 'children_overdue_amount',
+                      'children_next_due_date', 'children_last_payment_date'):
+            self.env.add_to_compute(Partner._fields[fname], partners)
+        self.env.flush_all()
+        self.env['school.revenue.summary']._trigger_refresh()
+
+        stats['duration'] = time.perf_counter() - started_at
+        _logger.info(
+            f'Archived academic year {academic_year}: {stats["invoices"]} invoices and '
+            f'{stats["transactions"]} payments in {stats["duration"]:.2f}s'
+        )
+        return stats
+
+
+class PaymentTransactionHistory(models.Model):
+    """Cold storage of the payment transactions of archived student invoices"""
+    _name = 'school.payment.transaction.history'
+    _description = 'Archived Payment Transaction'
+    _order = 'payment_date desc, id desc'
+
+    original_id = fields.Integer(string='Original ID', readonly=True, index=True)
+    name = fields.Char(string='Transaction Reference', readonly=True)
+    student_invoice_history_id = fields.Many2one(
+        'school.student.invoice.history',
+        string='Archived Invoice',
+        readonly=True,
+        ondelete='cascade',
+        index=True  # INDEX: Payment history of an archived invoice
+    )
+    student_invoice_original_id = fields.Integer(string='Original Invoice ID', readonly=True)
+    student_id = fields.Many2one('res.partner', string='Student', readonly=True, index=True, ondelete='set null')
+    invoice_id = fields.Many2one('account.move', string='Invoice', readonly=True, ondelete='set null')
+    payment_date = fields.Date(string='Payment Date', readonly=True)
+    amount = fields.Monetary(string='Amount', readonly=True)
+    currency_id = fields.Many2one('res.currency', string='Currency', readonly=True)
+
+    payment_method = fields.Selection(
+        selection=lambda self: self.env['school.payment.transaction']._fields['payment_method'].selection,
+        string='Payment Method',
+        readonly=True
+    )
+
+    payment_reference = fields.Char(string='Payment Reference', readonly=True)
+
+    state = fields.Selection(
+        selection=lambda self: self.env['school.payment.transaction']._fields['state'].selection,
+        string='Status',
+        readonly=True
+    )
+
+    account_payment_id = fields.Many2one('account.payment', string='Account Payment', readonly=True, ondelete='set null')
+    academic_year = fields.Char(string='Academic Year', readonly=True)
+    grade_level = fields.Selection(
+        selection=lambda self: self.env['res.partner']._fields['grade_level'].selection,
+        string='Grade Level',
+        readonly=True
+    )
+
+    def init(self):
+        # INDEX: History is read one academic year at a time
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS school_payment_transaction_history_year_idx
+                ON school_payment_transaction_history (academic_year, payment_date)
+        """)
@@ -1,6 +1,18 @@
 # -*- coding: utf-8 -*-
 
 from odoo import models, fields, api
+from collections import defaultdict
+
+# Move fields whose change does not alter the printed invoice
+PDF_NEUTRAL_FIELDS = {'is_move_sent', 'student_invoice_id', 'message_main_attachment_id'}
+
+# Written move fields that change the values denormalized on
+# school.student.invoice: amounts follow the lines, the due date the terms;
+# payments are caught on account.partial.reconcile
+SYNCED_WRITE_FIELDS = {
+    'invoice_date', 'invoice_date_due', 'currency_id', 'state',
+    'invoice_line_ids', 'line_ids', 'invoice_payment_term_id',
+}
 
 
 class AccountMove(models.Model):
@@ -42,4 +54,110 @@ class AccountMove(models.Model):
             'view_mode': 'form',
             'res_id': self.student_invoice_id.id,
             'target': 'current',
-        }
\ No newline at end of file
+        }
+
+    def _mark_student_invoices_dirty(self):
+        """
+        Queue the refresh of the student invoices of these moves.
+        Nothing is written here: the denormalized columns are refreshed
+        with one UPDATE for the whole transaction (see _mark_moves_dirty).
+        """
+        move_ids = [move.id for move in self if move.move_type == 'out_invoice' and move.is_school_invoice]
+        if move_ids:
+            self.env['school.student.invoice'].sudo()._mark_moves_dirty(move_ids)
+
+    def write(self, vals):
+        res = super().write(vals)
+        if not SYNCED_WRITE_FIELDS.isdisjoint(vals):
+            self._mark_student_invoices_dirty()
+        if 'state' in vals:
+            self._sync_student_invoice_state()
+        if not set(vals) <= PDF_NEUTRAL_FIELDS:
+            self._invalidate_student_invoice_pdf()
+        return res
+
+    def _invalidate_student_invoice_pdf(self):
+        """Drop the cached PDFs of the student invoices of these moves"""
+        school_moves = self.filtered('is_school_invoice')
+        if not school_moves:
+            return
+        self.env['school.student.invoice'].sudo().search([
+            ('invoice_id', 'in', school_moves.ids),
+            ('pdf_attachment_id', '!=', False),
+        ])._invalidate_pdf_cache()
+
+    def _get_student_invoice_state(self, student_invoice):
+        """
+        School status matching the accounting status of this move.
+        Draft moves keep the school status: the school workflow decides
+        when an invoice is sent or reset.
+        """
+        self.ensure_one()
+        if self.state == 'cancel':
+            return 'cancelled'
+        if self.state != 'posted':
+            return student_invoice.state
+        if self.payment_state in ('paid', 'in_payment'):
+            return 'paid'
+        if self.payment_state == 'partial':
+            return 'partial'
+        if self.payment_state == 'not_paid' and student_invoice.state in ('paid', 'partial'):
+            # Payment removed (unreconciled): back to an open status
+            due_date = self.invoice_date_due
+            return 'overdue' if due_date and due_date < fields.Date.today() else 'sent'
+        return student_invoice.state
+
+    def _sync_student_invoice_state(self):
+        """
+        Push the accounting status of these moves to their student invoices.
+
+        PERFORMANCE OPTIMIZATION:
+        - One indexed search on invoice_id for the whole recordset
+        - One write per target state instead of one per invoice
+        """
+        moves = self.filtered(lambda m: m.move_type == 'out_invoice')
+        if not moves:
+            return
+        student_invoices = self.env['school.student.invoice'].sudo().search([
+            ('invoice_id', 'in', moves.ids),
+            ('state', '!=', 'cancelled'),
+        ])
+        ids_by_state = defaultdict(list)
+        for student_invoice in student_invoices:
+            new_state = student_invoice.invoice_id._get_student_invoice_state(student_invoice)
+            if new_state != student_invoice.state:
+                ids_by_state[new_state].append(student_invoice.id)
+        for new_state, ids in ids_by_state.items():
+            student_invoices.browse(ids).write({'state': new_state})
+
+
+class AccountPartialReconcile(models.Model):
+    """
+    Keep the school invoice status and residual in sync with every
+    reconciliation.
+
+    WHY HERE?
+    - payment_state is a stored compute: it never goes through
+      account.move.write()
+    - Every way of adding or removing a payment (payment register,
+      reconciliation widget, _reconcile_plan, js_remove_outstanding_partial,
+      remove_move_reconcile) creates or deletes partials, so this catches
+      all of them with one hook
+    """
+    _inherit = 'account.partial.reconcile'
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        partials = super().create(vals_list)
+        moves = partials.debit_move_id.move_id | partials.credit_move_id.move_id
+        moves._sync_student_invoice_state()
+        moves._mark_student_invoices_dirty()
+        return partials
+
+    def unlink(self):
+        # Collect the moves before the partials are deleted
+        moves = self.debit_move_id.move_id | self.credit_move_id.move_id
+        res = super().unlink()
+        moves._sync_student_invoice_state()
+        moves._mark_student_invoices_dirty()
+        return res
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError
+
+
+class AuditLog(models.Model):
+    """
+    Narrow, append-only table of field changes.
+
+    WHY?
+    - mail.thread tracking writes mail.message and mail.tracking.value rows
+      and looks up followers for every tracked write: expensive during
+      cron runs and bulk operations
+    - In audit mode, changes are stored here instead, as plain rows
+      inserted in one statement per write() call
+
+    OPTIMIZATION:
+    - No create/write audit columns (_log_access = False): rows are never updated
+    - Composite (model, res_id, date) index serves the per-record viewer
+    """
+    _name = 'school.audit.log'
+    _description = 'Audit Log'
+    _order = 'date desc, id desc'
+    _log_access = False
+
+    model = fields.Char(string='Model', required=True, readonly=True)
+    res_id = fields.Integer(string='Record ID', required=True, readonly=True)
+    field_name = fields.Char(string='Field', required=True, readonly=True)
+    field_description = fields.Char(string='Field Label', readonly=True)
+    old_value = fields.Text(string='Old Value', readonly=True)
+    new_value = fields.Text(string='New Value', readonly=True)
+    user_id = fields.Many2one('res.users', string='User', readonly=True)
+    date = fields.Datetime(string='Date', required=True, readonly=True)
+
+    def init(self):
+        # INDEX: History of one record, newest first
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS school_audit_log_record_idx
+                ON school_audit_log (model, res_id, date DESC)
+        """)
+
+    def write(self, vals):
+        raise UserError(_('Audit log entries cannot be modified.'))
+
+    def unlink(self):
+        raise UserError(_('Audit log entries cannot be deleted.'))
+
+    @api.model
+    def _log_changes(self, changes):
+        """
+        Append changes with a single INSERT.
+
+        Args:
+            changes: list of (model, res_id, field_name, field_description,
+                     old_value, new_value) tuples
+        """
+        if not changes:
+            return
+        columns = list(zip(*changes))
+        self.env.cr.execute("""
+            INSERT INTO school_audit_log
+                   (model, res_id, field_name, field_description, old_value, new_value, user_id, date)
+            SELECT change.model, change.res_id, change.field_name, change.field_description,
+                   change.old_value, change.new_value, %s, NOW() AT TIME ZONE 'UTC'
+              FROM unnest(%s::varchar[], %s::int[], %s::varchar[], %s::varchar[], %s::text[], %s::text[])
+                   AS change(model, res_id, field_name, field_description, old_value, new_value)
+        """, [self.env.uid] + [list(column) for column in columns])
+
+
+class AuditMixin(models.AbstractModel):
+    """
+    Opt-in lightweight audit mode for high-volume models.
+
+    When audit mode is on, writes skip mail.thread tracking and the changes
+    of tracked fields are appended to school.audit.log instead. Audit mode
+    is enabled:
+    - per call, with the context key `school_audit_log`
+    - globally, with the system parameter `school_fee_management.audit_mode`
+      set to True, or to `cron` for scheduled actions only
+
+    List it before mail.thread in _inherit: its write() must run first so
+    that mail.thread's write() already sees tracking_disable.
+
+    Set-based SQL updates bypass write() and are not audited, except the
+    overdue state flip of auto_update_overdue_status, which logs its
+    changes itself. The other ones only touch untracked fields:
+    _sync_move_fields and _refresh_overdue_fields. The academic year
+    archive moves rows without changing fields; their audit entries are
+    rewritten to the history model and ids.
+    """
+    _name = 'school.audit.mixin'
+    _description = 'Lightweight Audit Log'
+
+    audit_log_ids = fields.One2many(
+        'school.audit.log',
+        string='Audit Log',
+        compute='_compute_audit_log_ids'
+    )
+
+    def _compute_audit_log_ids(self):
+        logs = self.env['school.audit.log'].search([
+            ('model', '=', self._name),
+            ('res_id', 'in', self.ids),
+        ])
+        for record in self:
+            record.audit_log_ids = logs.filtered(lambda log: log.res_id == record.id)
+
+    @api.model
+    def _is_audit_mode(self):
+        if 'school_audit_log' in self.env.context:
+            return bool(self.env.context['school_audit_log'])
+        param = self.env['ir.config_parameter'].sudo().get_param('school_fee_management.audit_mode', 'False').lower()
+        if param == 'cron':
+            return bool(self.env.context.get('cron_id'))
+        return param in ('true', '1')
+
+    @api.model
+    def _get_audit_fields(self):
+        """Fields recorded in audit mode: the fields tracked by mail.thread"""
+        return [name for name, field in self._fields.items() if getattr(field, 'tracking', False)]
+
+    def write(self, vals):
+        if not self or not self._is_audit_mode():
+            return super().write(vals)
+
+        audit_fields = [name for name in self._get_audit_fields() if name in vals]
+        if not audit_fields:
+            return super(AuditMixin, self.with_context(tracking_disable=True)).write(vals)
+
+        def display(record, name):
+            return self._fields[name].convert_to_display_name(record[name], record) or ''
+
+        old_values = {record.id: {name: display(record, name) for name in audit_fields} for record in self}
+        res = super(AuditMixin, self.with_context(tracking_disable=True)).write(vals)
+
+        changes = []
+        for record in self:
+            for name in audit_fields:
+                new_value = display(record, name)
+                if new_value != old_values[record.id][name]:
+                    changes.append((self._name, record.id, name, self._fields[name].string,
+                                    old_values[record.id][name], new_value))
+        self.env['school.audit.log'].sudo()._log_changes(changes)
+        return res
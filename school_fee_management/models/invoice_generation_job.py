@@ -0,0 +1,329 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError, ValidationError
+import logging
+
+_logger = logging.getLogger(__name__)
+
+# Grades with more students than this are split into student-id ranges
+GENERATION_JOB_MAX_STUDENTS = 5000
+
+# A running job whose heartbeat is older than this is considered abandoned
+# by a killed worker and can be claimed again
+GENERATION_JOB_STALE_MINUTES = 30
+
+# Identical worker crons: each one runs in its own cron thread/worker, so
+# several jobs are processed in parallel on a multi-worker deployment
+GENERATION_WORKER_CRONS = [
+    'school_fee_management.ir_cron_invoice_generation_worker_1',
+    'school_fee_management.ir_cron_invoice_generation_worker_2',
+    'school_fee_management.ir_cron_invoice_generation_worker_3',
+    'school_fee_management.ir_cron_invoice_generation_worker_4',
+]
+
+
+class InvoiceGenerationJob(models.Model):
+    """
+    Persistent progress record for semester invoice generation.
+
+    WHY A JOB RECORD?
+    - The cursor (last processed student id) is committed together with each
+      chunk of invoices, so a crash never leaves half-known progress
+    - A killed or timed-out cron resumes from the cursor on its next run
+      instead of rescanning every res.partner and creating duplicates
+    - Counters and errors stay visible to accountants after the run
+
+    PERFORMANCE OPTIMIZATION:
+    - Students are fetched with keyset pagination on id (id > cursor)
+    - Each chunk is processed under savepoints and committed once
+    - One job per grade level (or student-id range for large grades), so the
+      worker crons process disjoint sets of students in parallel
+    - Jobs are claimed with SELECT ... FOR UPDATE SKIP LOCKED: two workers
+      never pick the same job
+    """
+    _name = 'school.invoice.generation.job'
+    _description = 'Invoice Generation Job'
+    _order = 'id desc'
+
+    name = fields.Char(string='Name', compute='_compute_name', store=True)
+
+    semester = fields.Selection([
+        ('fall', 'Fall'),
+        ('spring', 'Spring'),
+        ('summer', 'Summer'),
+    ], string='Semester', required=True, readonly=True)
+
+    academic_year = fields.Char(string='Academic Year', required=True, readonly=True)
+
+    grade_level = fields.Selection(
+        selection='_get_grade_level_selection',
+        string='Grade Level',
+        readonly=True
+    )
+
+    id_max = fields.Integer(
+        string='Last Student ID',
+        readonly=True,
+        help='Upper bound of the student-id range handled by this job. 0 means no bound.'
+    )
+
+    state = fields.Selection([
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ], string='Status', default='pending', required=True,
+        index=True,  # INDEX: Fast lookup of unfinished jobs by the cron
+        copy=False)
+
+    cursor = fields.Integer(
+        string='Last Processed Student ID',
+        default=0,
+        readonly=True,
+        copy=False,
+        help='Id of the last res.partner processed. Resumed runs start right after it.'
+    )
+
+    chunk_size = fields.Integer(string='Chunk Size', default=500, required=True)
+
+    processed_count = fields.Integer(string='Processed Students', readonly=True, copy=False)
+    created_count = fields.Integer(string='Created Invoices', readonly=True, copy=False)
+    skipped_count = fields.Integer(string='Skipped Students', readonly=True, copy=False)
+    already_invoiced_count = fields.Integer(string='Already Invoiced', readonly=True, copy=False)
+    error_count = fields.Integer(string='Errors', readonly=True, copy=False)
+    error_log = fields.Text(string='Error Log', readonly=True, copy=False)
+
+    date_start = fields.Datetime(string='Started On', readonly=True, copy=False)
+    date_end = fields.Datetime(string='Finished On', readonly=True, copy=False)
+    heartbeat = fields.Datetime(string='Last Heartbeat', readonly=True, copy=False)
+
+    @api.model
+    def _get_grade_level_selection(self):
+        return self.env['res.partner']._fields['grade_level'].selection
+
+    @api.depends('semester', 'academic_year', 'grade_level', 'id_max')
+    def _compute_name(self):
+        """Generate descriptive name for the job"""
+        grade_names = dict(self._get_grade_level_selection())
+        for job in self:
+            semester_name = dict(self._fields['semester'].selection).get(job.semester) or ''
+            parts = [semester_name, job.academic_year or '', grade_names.get(job.grade_level, '')]
+            if job.id_max:
+                parts.append(f'(up to student #{job.id_max})')
+            job.name = ' '.join(filter(None, parts))
+
+    @api.constrains('chunk_size')
+    def _check_chunk_size(self):
+        """Chunk size must be a positive number of students"""
+        for job in self:
+            if job.chunk_size <= 0:
+                raise ValidationError(_('Chunk size must be greater than zero.'))
+
+    @api.model
+    def _prepare_jobs(self, semester, academic_year):
+        """
+        Fan the semester generation out into independent jobs.
+
+        If jobs of this semester/year are still unfinished they are reused
+        (failed ones are queued again), so an interrupted run resumes from
+        each job cursor. Otherwise one job is created per grade level, large
+        grades being split into contiguous student-id ranges.
+        """
+        unfinished = self.search([
+            ('semester', '=', semester),
+            ('academic_year', '=', academic_year),
+            ('state', 'in', ['pending', 'running', 'failed']),
+        ])
+        if unfinished:
+            unfinished.filtered(lambda j: j.state == 'failed').write({'state': 'pending'})
+            return unfinished
+
+        student_ids_by_grade = {}
+        students = self.env['res.partner'].search_fetch([
+            ('is_student', '=', True),
+            ('active', '=', True),
+            ('grade_level', '!=', False),
+        ], ['grade_level'], order='id')
+        for student in students:
+            student_ids_by_grade.setdefault(student.grade_level, []).append(student.id)
+
+        vals_list = []
+        for grade_level, student_ids in student_ids_by_grade.items():
+            for offset in range(0, len(student_ids), GENERATION_JOB_MAX_STUDENTS):
+                id_range = student_ids[offset:offset + GENERATION_JOB_MAX_STUDENTS]
+                split = len(student_ids) > GENERATION_JOB_MAX_STUDENTS
+                vals_list.append({
+                    'semester': semester,
+                    'academic_year': academic_year,
+                    'grade_level': grade_level,
+                    'cursor': id_range[0] - 1 if split else 0,
+                    'id_max': id_range[-1] if split else 0,
+                })
+        return self.create(vals_list)
+
+    def _get_student_domain(self):
+        """Students handled by this job, excluding the ones already processed"""
+        self.ensure_one()
+        domain = [
+            ('is_student', '=', True),
+            ('active', '=', True),
+            ('grade_level', '!=', False),
+            ('id', '>', self.cursor),
+        ]
+        if self.grade_level:
+            domain.append(('grade_level', '=', self.grade_level))
+        if self.id_max:
+            domain.append(('id', '<=', self.id_max))
+        return domain
+
+    @api.model
+    def _trigger_workers(self):
+        """Wake every worker cron up so the pending jobs start right away"""
+        for xmlid in GENERATION_WORKER_CRONS:
+            cron = self.env.ref(xmlid, raise_if_not_found=False)
+            if cron and cron.active:
+                cron._trigger()
+
+    @api.model
+    def _claim_next_job(self):
+        """
+        Atomically claim one job for the current worker.
+
+        SKIP LOCKED lets concurrent workers pass over a row another worker is
+        claiming, and the state/heartbeat update is committed immediately so
+        the claim is visible to everybody. Running jobs with a stale heartbeat
+        belong to a killed worker and are taken over.
+        """
+        self.flush_model()
+        self.env.cr.execute("""
+            UPDATE school_invoice_generation_job
+               SET state = 'running',
+                   heartbeat = (now() at time zone 'UTC')
+             WHERE id = (
+                    SELECT id
+                      FROM school_invoice_generation_job
+                     WHERE state = 'pending'
+                        OR (state = 'running'
+                            AND (heartbeat IS NULL
+                                 OR heartbeat < (now() at time zone 'UTC') - make_interval(mins => %s)))
+                  ORDER BY id
+                     LIMIT 1
+                       FOR UPDATE SKIP LOCKED
+                   )
+         RETURNING id
+        """, [GENERATION_JOB_STALE_MINUTES])
+        row = self.env.cr.fetchone()
+        self.env.cr.commit()
+        self.invalidate_model(['state', 'heartbeat'])
+        return self.browse(row[0]) if row else self.browse()
+
+    @api.model
+    def cron_process_generation_jobs(self):
+        """
+        Worker cron: claim and process jobs until none is left.
+        Several copies of this cron run in parallel, each in its own worker.
+        """
+        while True:
+            job = self._claim_next_job()
+            if not job:
+                break
+            job._run()
+        return True
+
+    def _run(self):
+        """
+        Process the job chunk by chunk.
+
+        Each chunk is committed together with the new cursor and counters,
+        so the job record always describes exactly what is in the database.
+        """
+        StudentInvoice = self.env['school.student.invoice']
+        Partner = self.env['res.partner']
+        # Fee amounts memoized across the chunks of the run
+        amount_memo = {}
+
+        for job in self:
+            if job.state == 'done':
+                continue
+
+            job.write({
+                'state': 'running',
+                'date_start': job.date_start or fields.Datetime.now(),
+                'heartbeat': fields.Datetime.now(),
+            })
+            self.env.cr.commit()
+            _logger.info(f'Invoice generation job {job.name} started at student id {job.cursor}')
+
+            try:
+                while True:
+                    students = Partner.search(job._get_student_domain(), order='id', limit=job.chunk_size)
+                    if not students:
+                        break
+
+                    stats = StudentInvoice._generate_semester_invoices(
+                        students, job.semester, job.academic_year, batch_size=job.chunk_size,
+                        amount_memo=amount_memo,
+                    )
+
+                    vals = {
+                        'cursor': students[-1].id,
+                        'processed_count': job.processed_count + len(students),
+                        'created_count': job.created_count + stats['created'],
+                        'skipped_count': job.skipped_count + stats['skipped'],
+                        'already_invoiced_count': job.already_invoiced_count + stats['already_invoiced'],
+                        'error_count': job.error_count + stats['errors'],
+                    }
+                    if stats['error_messages']:
+                        vals['error_log'] = '\n'.join(filter(None, [job.error_log] + stats['error_messages']))
+                    vals['heartbeat'] = fields.Datetime.now()
+                    job.write(vals)
+                    self.env.cr.commit()
+
+                    _logger.info(
+                        f'Job {job.name}: committed chunk up to student id {job.cursor} '
+                        f'({stats["created"]} created, {stats["rate"]:.1f} students/sec)'
+                    )
+            except Exception as e:
+                self.env.cr.rollback()
+                job.write({
+                    'state': 'failed',
+                    'error_log': '\n'.join(filter(None, [job.error_log, str(e)])),
+                })
+                self.env.cr.commit()
+                _logger.exception(f'Invoice generation job {job.name} failed')
+                continue
+
+            job.write({'state': 'done', 'date_end': fields.Datetime.now()})
+            self.env['school.revenue.summary']._trigger_refresh()
+            self.env.cr.commit()
+            _logger.info(
+                f'Invoice generation job {job.name} complete. Created: {job.created_count}, '
+                f'Skipped: {job.skipped_count}, Already invoiced: {job.already_invoiced_count}, '
+                f'Errors: {job.error_count}'
+            )
+
+        return True
+
+    def action_run(self):
+        """
+        Resume the job from the user interface.
+
+        The job is handed back to the worker crons instead of being run
+        inline: _run() commits per chunk, which must not happen inside the
+        HTTP request's transaction.
+        """
+        for job in self:
+            if job.state == 'done':
+                raise UserError(_('Job %s is already done.') % job.name)
+        self.filtered(lambda j: j.state == 'failed').write({'state': 'pending'})
+        self._trigger_workers()
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'type': 'info',
+                'message': _('%s job(s) queued, the generation workers will resume them shortly.') % len(self),
+                'next': {'type': 'ir.actions.act_window_close'},
+            },
+        }
@@ -1,11 +1,20 @@
 # -*- coding: utf-8 -*-
 
 from odoo import models, fields, api, _
-from odoo.exceptions import ValidationError
+from odoo.exceptions import ValidationError, UserError
+from odoo.tools import split_every
+from collections import defaultdict
 import logging
+import time
 
 _logger = logging.getLogger(__name__)
 
+# Number of transactions reconciled per batch by the cron
+RECONCILE_BATCH_SIZE = 200
+
+# Fields moving a transaction between daily collection rollup rows
+COLLECTION_FIELDS = ('state', 'amount', 'payment_date', 'payment_method', 'currency_id', 'student_invoice_id')
+
 
 class PaymentTransaction(models.Model):
     """
@@ -25,7 +34,7 @@ class PaymentTransaction(models.Model):
     """
     _name = 'school.payment.transaction'
     _description = 'Payment Transaction'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['school.audit.mixin', 'mail.thread', 'mail.activity.mixin', 'school.pdf.cache.mixin']
     _order = 'payment_date desc, id desc'
 
     name = fields.Char(
@@ -125,12 +134,43 @@ class PaymentTransaction(models.Model):
         readonly=True
     )
 
-    @api.model
-    def create(self, vals):
-        """Generate unique transaction reference on creation"""
-        if vals.get('name', _('New')) == _('New'):
-            vals['name'] = self.env['ir.sequence'].next_by_code('school.payment.transaction') or _('New')
-        return super().create(vals)
+    @api.model_create_multi
+    def create(self, vals_list):
+        """
+        Generate unique transaction references on creation.
+        The references of the whole batch are reserved as one sequence block
+        instead of one next_by_code() call per transaction.
+        """
+        new_vals = [vals for vals in vals_list if vals.get('name', _('New')) == _('New')]
+        names = self.env['ir.sequence']._next_block_by_code('school.payment.transaction', len(new_vals))
+        for vals, name in zip(new_vals, names):
+            vals['name'] = name or _('New')
+        records = super().create(vals_list)
+        Collection = self.env['school.payment.collection'].sudo()
+        Collection._apply_deltas(Collection._get_transaction_deltas(records, 1))
+        return records
+
+    def write(self, vals):
+        """
+        Keep the daily collection rollup in sync.
+
+        PERFORMANCE OPTIMIZATION:
+        - Only writes touching COLLECTION_FIELDS compute deltas
+        - Contributions before and after the write are netted in one upsert:
+          reconciling confirmed payments issues no rollup query at all
+        """
+        if not self or not any(fname in vals for fname in COLLECTION_FIELDS):
+            return super().write(vals)
+        Collection = self.env['school.payment.collection'].sudo()
+        deltas = Collection._get_transaction_deltas(self, -1)
+        res = super().write(vals)
+        Collection._apply_deltas(deltas + Collection._get_transaction_deltas(self, 1))
+        return res
+
+    def unlink(self):
+        Collection = self.env['school.payment.collection'].sudo()
+        Collection._apply_deltas(Collection._get_transaction_deltas(self, -1))
+        return super().unlink()
 
     @api.constrains('amount')
     def _check_amount(self):
@@ -155,67 +195,203 @@ class PaymentTransaction(models.Model):
 
     def action_confirm(self):
         """
-        Confirm payment transaction.
-        This validates the payment but doesn't reconcile it yet.
+        Confirm payment transactions.
+        This validates the payments but doesn't reconcile them yet.
+
+        PERFORMANCE OPTIMIZATION:
+        - One write for all transactions and one write per target invoice state
+        - One consolidated audit message per student invoice
+        - Per-transaction chatter (messages and tracking) can be turned off
+          for machine imports, see _is_transaction_chatter_enabled()
         """
-        for record in self:
-            if record.state != 'draft':
-                raise ValidationError(_('Only draft transactions can be confirmed.'))
+        if any(record.state != 'draft' for record in self):
+            raise ValidationError(_('Only draft transactions can be confirmed.'))
+
+        chatter_enabled = self._is_transaction_chatter_enabled()
+        transactions = self if chatter_enabled else self.with_context(tracking_disable=True)
+        transactions.write({'state': 'confirmed'})
+
+        if chatter_enabled:
+            for record in self:
+                record.message_post(
+                    body=_('Payment of %s confirmed by %s') % (
+                        record.amount,
+                        self.env.user.name
+                    ),
+                    subject=_('Payment Confirmed')
+                )
 
-            record.write({'state': 'confirmed'})
-            record.message_post(
-                body=_('Payment of %s confirmed by %s') % (
-                    record.amount,
-                    self.env.user.name
-                ),
+        # Update invoice states: one audit message per invoice, one write per state
+        invoice_ids_by_state = defaultdict(list)
+        for student_invoice, invoice_transactions in self.grouped('student_invoice_id').items():
+            student_invoice.message_post(
+                body=_('%(count)s payment(s) totalling %(amount)s confirmed by %(user)s: %(references)s',
+                       count=len(invoice_transactions),
+                       amount=sum(invoice_transactions.mapped('amount')),
+                       user=self.env.user.name,
+                       references=', '.join(invoice_transactions.mapped('name'))),
                 subject=_('Payment Confirmed')
             )
-
             # Update invoice state if fully paid
-            if record.student_invoice_id.amount_residual <= 0:
-                record.student_invoice_id.write({'state': 'paid'})
-            elif record.student_invoice_id.state in ['sent', 'overdue']:
-                record.student_invoice_id.write({'state': 'partial'})
+            if student_invoice.amount_residual <= 0:
+                invoice_ids_by_state['paid'].append(student_invoice.id)
+            elif student_invoice.state in ['sent', 'overdue']:
+                invoice_ids_by_state['partial'].append(student_invoice.id)
+
+        for state, invoice_ids in invoice_ids_by_state.items():
+            self.env['school.student.invoice'].browse(invoice_ids).write({'state': state})
+        return True
+
+    def _get_pdf_source(self):
+        self.ensure_one()
+        payment = self.account_payment_id
+        return 'account.action_report_payment_receipt', payment if payment.state != 'draft' else payment.browse()
+
+    def _get_pdf_cache_key_parts(self):
+        payment = self.account_payment_id
+        return (payment.id, payment.name, payment.state, payment.amount, payment.write_date)
+
+    def _is_transaction_chatter_enabled(self):
+        """
+        Whether bulk actions post one chatter message per transaction.
+
+        Disabled by the `school_skip_transaction_chatter` context key (used by
+        machine imports) or globally with the system parameter
+        `school_fee_management.transaction_chatter` set to False.
+        """
+        if self.env.context.get('school_skip_transaction_chatter'):
+            return False
+        param = self.env['ir.config_parameter'].sudo().get_param('school_fee_management.transaction_chatter', 'True')
+        return param.lower() not in ('false', '0')
 
     def action_reconcile(self):
         """
-        Reconcile payment with accounting invoice.
-        This creates the actual account.payment record.
+        Reconcile payment transactions with their accounting invoices.
+        This creates the actual account.payment records.
+
+        PERFORMANCE OPTIMIZATION:
+        - Bank journal resolved once for the whole recordset
+        - account.payment records created with one create() and posted together
+        - One _reconcile_plan() call for the whole recordset; each plan holds
+          one invoice's receivable lines and the lines of its own payments
+          only, so a parent paying for several children never has a sibling's
+          payment applied to the wrong invoice
+        - Payment links stored with one UPDATE
         """
-        self.ensure_one()
-        if self.state != 'confirmed':
+        if not self:
+            return True
+        if any(record.state != 'confirmed' for record in self):
             raise ValidationError(_('Only confirmed transactions can be reconciled.'))
 
-        # Create accounting payment
-        payment_vals = {
+        journal = self._get_reconcile_journal()
+
+        # Create accounting payments
+        payments = self.env['account.payment'].create([
+            record._prepare_account_payment_vals(journal) for record in self
+        ])
+        payments.action_post()
+
+        def receivable_lines(lines):
+            return lines.filtered(
+                lambda l: l.account_id.account_type in ('asset_receivable', 'liability_payable')
+                and not l.reconciled)
+
+        # Reconcile every invoice with its own payments
+        payment_lines_by_invoice = defaultdict(lambda: self.env['account.move.line'])
+        for record, payment in zip(self, payments):
+            payment_lines_by_invoice[record.invoice_id] |= receivable_lines(payment.line_ids)
+        self.env['account.move.line']._reconcile_plan([
+            receivable_lines(invoice.line_ids) + payment_lines
+            for invoice, payment_lines in payment_lines_by_invoice.items()
+        ])
+
+        chatter_enabled = self._is_transaction_chatter_enabled()
+        transactions = self if chatter_enabled else self.with_context(tracking_disable=True)
+        transactions.write({'state': 'reconciled'})
+        self.env.cr.execute("""
+            UPDATE school_payment_transaction t
+               SET account_payment_id = link.payment_id
+              FROM unnest(%s::int[], %s::int[]) AS link(transaction_id, payment_id)
+             WHERE t.id = link.transaction_id
+        """, [self.ids, payments.ids])
+        self.invalidate_recordset(['account_payment_id'])
+        self.modified(['account_payment_id'])
+
+        if chatter_enabled:
+            for record, payment in zip(self, payments):
+                record.message_post(
+                    body=_('Payment reconciled with invoice. Payment ID: %s') % payment.name,
+                    subject=_('Payment Reconciled')
+                )
+        return True
+
+    @api.model
+    def _get_reconcile_journal(self):
+        """Bank journal receiving the school payments, resolved once per batch"""
+        journal = self.env['account.journal'].search([
+            ('type', '=', 'bank'),
+            ('company_id', '=', self.env.company.id),
+        ], limit=1)
+        if not journal:
+            raise UserError(_('Please configure a bank journal before reconciling payments.'))
+        return journal
+
+    def _prepare_account_payment_vals(self, journal):
+        """
+        Values of the account.payment of this transaction.
+        The payment partner is the invoice partner (the parent when the
+        student has one) so both sides of the reconciliation match.
+        """
+        self.ensure_one()
+        return {
             'payment_type': 'inbound',
             'partner_type': 'customer',
-            'partner_id': self.student_id.id,
+            'partner_id': (self.invoice_id.partner_id or self.student_id).id,
             'amount': self.amount,
+            'currency_id': self.currency_id.id,
             'date': self.payment_date,
             'ref': self.name,
-            'journal_id': self.env['account.journal'].search([('type', '=', 'bank')], limit=1).id,
+            'journal_id': journal.id,
         }
 
-        payment = self.env['account.payment'].create(payment_vals)
-        payment.action_post()
-
-        # Reconcile with invoice
-        payment_lines = payment.line_ids.filtered(
-            lambda l: l.account_id.account_type in ('asset_receivable', 'liability_payable'))
-        invoice_lines = self.invoice_id.line_ids.filtered(
-            lambda l: l.account_id.account_type in ('asset_receivable', 'liability_payable'))
-        (payment_lines + invoice_lines).reconcile()
-
-        self.write({
-            'state': 'reconciled',
-            'account_payment_id': payment.id
-        })
-
-        self.message_post(
-            body=_('Payment reconciled with invoice. Payment ID: %s') % payment.name,
-            subject=_('Payment Reconciled')
-        )
+    @api.model
+    def cron_reconcile_confirmed_transactions(self, batch_size=RECONCILE_BATCH_SIZE):
+        """
+        Scheduled action reconciling every confirmed transaction in batches.
+
+        Each batch runs under a savepoint and is committed on success. A
+        failing batch is replayed transaction by transaction so only the
+        faulty ones are left confirmed. Throughput and failures are logged
+        per batch.
+        """
+        transactions = self.search([('state', '=', 'confirmed')], order='id')
+        done = 0
+        for batch in split_every(batch_size, transactions.ids, self.browse):
+            started_at = time.perf_counter()
+            failures = []
+            try:
+                with self.env.cr.savepoint():
+                    batch.action_reconcile()
+            except Exception as e:
+                _logger.warning(f'Reconciliation batch of {len(batch)} failed, retrying one by one: {str(e)}')
+                for record in batch:
+                    try:
+                        with self.env.cr.savepoint():
+                            record.action_reconcile()
+                    except Exception as e:
+                        failures.append(record)
+                        _logger.error(f'Error reconciling payment transaction {record.name}: {str(e)}')
+            self.env.cr.commit()
+
+            done += len(batch)
+            duration = time.perf_counter() - started_at
+            _logger.info(
+                f'Reconciled {len(batch) - len(failures)}/{len(batch)} transactions in {duration:.2f}s '
+                f'({len(batch) / duration if duration else 0.0:.1f} transactions/sec), '
+                f'{len(failures)} failures'
+            )
+            self.env['ir.cron']._notify_progress(done=done, remaining=len(transactions) - done)
+        return True
 
     def action_cancel(self):
         """Cancel payment transaction with audit trail"""
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, fields, _
+from odoo.exceptions import UserError
+import hashlib
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+class PdfCacheMixin(models.AbstractModel):
+    """
+    Store the rendered PDF of a record as an attachment and serve it again
+    until the underlying accounting document changes.
+
+    WHY?
+    - Parents download the same invoice PDFs again and again
+    - Every download used to render through wkhtmltopdf, the most CPU-heavy
+      request of the portal
+    - The cache key is a hash of the source document's identity, write_date
+      and payment status: a changed document renders once, then is cached
+
+    Models using the mixin override _get_pdf_source() (by default there is
+    nothing to print) and usually _get_pdf_cache_key_parts() (by default the
+    record's own write_date).
+    """
+    _name = 'school.pdf.cache.mixin'
+    _description = 'Cached PDF Rendering'
+
+    pdf_attachment_id = fields.Many2one(
+        'ir.attachment',
+        string='Cached PDF',
+        copy=False,
+        readonly=True,
+        ondelete='set null'
+    )
+
+    pdf_cache_key = fields.Char(string='PDF Cache Key', copy=False, readonly=True)
+
+    def _get_pdf_source(self):
+        """
+        Return (report xmlid, record to render). An empty record means there
+        is nothing to print yet, e.g. a draft accounting document.
+        """
+        self.ensure_one()
+        return False, self.browse()
+
+    def _get_pdf_cache_key_parts(self):
+        """Values that change whenever the rendered document would change"""
+        self.ensure_one()
+        return (self.id, self.write_date)
+
+    def _get_pdf_filename(self):
+        self.ensure_one()
+        return '%s.pdf' % (self.display_name or self._name).replace('/', '_')
+
+    def _compute_pdf_cache_key(self):
+        self.ensure_one()
+        parts = ':'.join(map(str, self._get_pdf_cache_key_parts()))
+        return hashlib.sha1(parts.encode()).hexdigest()
+
+    def _get_cached_pdf(self):
+        """
+        Return the PDF attachment of the record, rendering it only when the
+        cache is empty or its key no longer matches the source document.
+        """
+        self.ensure_one()
+        report_ref, source = self._get_pdf_source()
+        if not source:
+            raise UserError(_('There is no document to print for %s.') % self.display_name)
+
+        key = self._compute_pdf_cache_key()
+        if self.pdf_attachment_id and self.pdf_cache_key == key:
+            return self.pdf_attachment_id
+
+        content, _report_type = self.env['ir.actions.report'].sudo()._render_qweb_pdf(report_ref, source.ids)
+        attachment = self.env['ir.attachment'].sudo().create({
+            'name': self._get_pdf_filename(),
+            'raw': content,
+            'mimetype': 'application/pdf',
+            'res_model': self._name,
+            'res_id': self.id,
+        })
+        stale = self.sudo().pdf_attachment_id
+        # Plain UPDATE: storing the cache must not bump write_date, which is
+        # part of the cache key
+        self.flush_recordset(['pdf_attachment_id', 'pdf_cache_key'])
+        self.env.cr.execute(
+            'UPDATE "%s" SET pdf_attachment_id = %%s, pdf_cache_key = %%s WHERE id = %%s' % self._table,
+            [attachment.id, key, self.id])
+        self.invalidate_recordset(['pdf_attachment_id', 'pdf_cache_key'])
+        stale.unlink()
+        return attachment
+
+    def _invalidate_pdf_cache(self):
+        """Drop the cached PDFs of these records"""
+        cached = self.sudo().filtered('pdf_attachment_id')
+        if cached:
+            attachments = cached.pdf_attachment_id
+            cached.write({'pdf_attachment_id': False, 'pdf_cache_key': False})
+            attachments.unlink()
+
+    def _warm_pdf_cache(self):
+        """
+        Render the missing or stale PDFs of these records ahead of the
+        first download. A failing render is logged and skipped.
+        """
+        warmed = 0
+        for record in self:
+            try:
+                with self.env.cr.savepoint():
+                    record._get_cached_pdf()
+                warmed += 1
+            except Exception as e:
+                _logger.error(f'Error rendering PDF of {record.display_name}: {str(e)}')
+        return warmed
@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 
-from odoo import models, fields, api
+from odoo import models, fields, api, _
+from odoo.exceptions import ValidationError
 
 
 class ResPartner(models.Model):
@@ -41,6 +42,11 @@ class ResPartner(models.Model):
 
     enrollment_date = fields.Date(string='Enrollment Date')
 
+    scholarship_percentage = fields.Float(
+        string='Scholarship (%)',
+        help='Discount applied to every fee invoiced to this student.'
+    )
+
     # Parent relationship - use Odoo's built-in parent_id
     # parent_id already exists in res.partner for company hierarchies
     # We'll use it for student-parent relationships too
@@ -58,24 +64,143 @@ class ResPartner(models.Model):
         string='Children Invoices'
     )
 
+    # Stored so that "top debtors" lists can search and sort on the balance
+    # without loading invoices; recomputed only for the students whose
+    # invoices change
     total_outstanding = fields.Monetary(
         string='Total Outstanding',
         compute='_compute_total_outstanding',
-        currency_field='currency_id'
+        currency_field='currency_id',
+        store=True,
+        index=True  # INDEX: Fast sorting of top debtor lists
+    )
+
+    # Per-parent balance summary read by the portal landing page.
+    # Stored on the parent row and maintained incrementally: only parents
+    # whose children's invoices or payments change are recomputed.
+    children_total_outstanding = fields.Monetary(
+        string='Children Outstanding',
+        compute='_compute_parent_balance_summary',
+        currency_field='currency_id',
+        store=True,
+        index=True  # INDEX: Fast sorting of parents by family balance
+    )
+
+    children_overdue_amount = fields.Monetary(
+        string='Children Overdue Amount',
+        compute='_compute_parent_balance_summary',
+        currency_field='currency_id',
+        store=True
+    )
+
+    # Earliest due date still to come: past due dates are covered by the
+    # overdue amount. Depends on today, so the daily overdue cron refreshes
+    # the parents whose stored date has passed (_refresh_children_next_due_date)
+    children_next_due_date = fields.Date(
+        string='Next Due Date',
+        compute='_compute_parent_balance_summary',
+        store=True
+    )
+
+    children_last_payment_date = fields.Date(
+        string='Last Payment Date',
+        compute='_compute_parent_balance_summary',
+        store=True
     )
 
-    @api.depends('student_invoice_ids.amount_residual')
+    @api.constrains('scholarship_percentage')
+    def _check_scholarship_percentage(self):
+        for partner in self:
+            if partner.scholarship_percentage < 0 or partner.scholarship_percentage > 100:
+                raise ValidationError(_('Scholarship must be between 0 and 100.'))
+
+    @api.depends('is_student', 'student_invoice_ids.amount_residual', 'student_invoice_ids.state')
     def _compute_total_outstanding(self):
-        """Calculate total outstanding balance for student"""
+        """
+        Calculate total outstanding balance for student.
+
+        PERFORMANCE OPTIMIZATION:
+        - One grouped SQL aggregate for the whole recordset, instead of
+          loading and filtering every invoice of every partner
+        """
+        partner_ids = [pid for pid in self._origin.ids if pid]
+        by_student = {}
+        if partner_ids:
+            by_student = {
+                student.id: total for student, total in self.env['school.student.invoice'].sudo()._read_group([
+                    ('student_id', 'in', partner_ids),
+                    ('state', 'not in', ['cancelled', 'paid']),
+                ], ['student_id'], ['amount_residual:sum'])
+            }
+
+        for partner in self:
+            partner.total_outstanding = by_student.get(partner._origin.id, 0.0) if partner.is_student else 0.0
+
+    @api.depends('parent_invoice_ids.amount_residual', 'parent_invoice_ids.state',
+                 'parent_invoice_ids.due_date', 'parent_invoice_ids.is_overdue',
+                 'parent_invoice_ids.payment_transaction_ids.state',
+                 'parent_invoice_ids.payment_transaction_ids.payment_date')
+    def _compute_parent_balance_summary(self):
+        """
+        Outstanding and overdue amounts, next upcoming due date and last
+        payment date over all the children of a parent.
+
+        PERFORMANCE OPTIMIZATION:
+        - Four grouped aggregates for the whole recordset, whatever the
+          number of parents, children or invoices
+        """
+        partner_ids = [pid for pid in self._origin.ids if pid]
+        open_totals = {}
+        next_due_dates = {}
+        overdue_totals = {}
+        last_payments = {}
+        if partner_ids:
+            Invoice = self.env['school.student.invoice'].sudo()
+            domain = [('parent_id', 'in', partner_ids), ('state', 'not in', ['cancelled', 'paid'])]
+            open_totals = {
+                parent.id: total for parent, total in Invoice._read_group(
+                    domain, ['parent_id'], ['amount_residual:sum'])
+            }
+            next_due_dates = {
+                parent.id: next_due for parent, next_due in Invoice._read_group(
+                    domain + [('due_date', '>=', fields.Date.today())], ['parent_id'], ['due_date:min'])
+            }
+            overdue_totals = {
+                parent.id: total for parent, total in Invoice._read_group(
+                    domain + [('is_overdue', '=', True)], ['parent_id'], ['amount_residual:sum'])
+            }
+
+            # Payments are grouped on the parent of their invoice: plain SQL join
+            Invoice.flush_model(['parent_id'])
+            self.env['school.payment.transaction'].flush_model(['student_invoice_id', 'state', 'payment_date'])
+            self.env.cr.execute("""
+                SELECT inv.parent_id, MAX(pay.payment_date)
+                  FROM school_payment_transaction pay
+                  JOIN school_student_invoice inv ON inv.id = pay.student_invoice_id
+                 WHERE inv.parent_id IN %s
+                   AND pay.state IN ('confirmed', 'reconciled')
+              GROUP BY inv.parent_id
+            """, [tuple(partner_ids)])
+            last_payments = dict(self.env.cr.fetchall())
+
         for partner in self:
-            if partner.is_student:
-                partner.total_outstanding = sum(
-                    partner.student_invoice_ids.filtered(
-                        lambda inv: inv.state not in ['cancelled', 'paid']
-                    ).mapped('amount_residual')
-                )
-            else:
-                partner.total_outstanding = 0.0
+            partner_id = partner._origin.id
+            partner.children_total_outstanding = open_totals.get(partner_id, 0.0)
+            partner.children_overdue_amount = overdue_totals.get(partner_id, 0.0)
+            partner.children_next_due_date = next_due_dates.get(partner_id, False)
+            partner.children_last_payment_date = last_payments.get(partner_id, False)
+
+    @api.model
+    def _refresh_children_next_due_date(self):
+        """
+        Daily recompute of the parents whose next due date is now past.
+        Only these parents are recomputed, in one batch.
+        """
+        parents = self.sudo().search([('children_next_due_date', '<', fields.Date.today())])
+        if parents:
+            self.env.add_to_compute(self._fields['children_next_due_date'], parents)
+            parents.flush_recordset(['children_next_due_date'])
+        return parents
 
     _sql_constraints = [
         ('student_id_unique',
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, fields, api
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+class RevenueSummary(models.Model):
+    """
+    Pre-aggregated invoice totals for the finance pivot and graph reports.
+
+    WHY A MATERIALIZED VIEW?
+    - The reports used to run read_group over the whole school.student.invoice
+      table on every open
+    - The view holds one row per grade level, semester, academic year, state,
+      aging bucket and currency: a few thousand rows even at multi-year scale
+    - REFRESH ... CONCURRENTLY keeps the reports readable while a cron
+      rebuilds the totals in the background
+    """
+    _name = 'school.revenue.summary'
+    _description = 'Student Invoice Revenue Summary'
+    _auto = False
+    _order = 'academic_year desc, grade_level, semester'
+    _rec_name = 'grade_level'
+
+    grade_level = fields.Selection(
+        selection=lambda self: self.env['res.partner']._fields['grade_level'].selection,
+        string='Grade Level',
+        readonly=True
+    )
+
+    semester = fields.Selection([
+        ('fall', 'Fall'),
+        ('spring', 'Spring'),
+        ('summer', 'Summer'),
+    ], string='Semester', readonly=True)
+
+    academic_year = fields.Char(string='Academic Year', readonly=True)
+
+    state = fields.Selection([
+        ('draft', 'Draft'),
+        ('sent', 'Sent'),
+        ('partial', 'Partially Paid'),
+        ('paid', 'Paid'),
+        ('overdue', 'Overdue'),
+        ('cancelled', 'Cancelled'),
+    ], string='Status', readonly=True)
+
+    aging_bucket = fields.Selection([
+        ('current', 'Not Overdue'),
+        ('0_30', '0-30 Days'),
+        ('31_60', '31-60 Days'),
+        ('61_90', '61-90 Days'),
+        ('90_plus', '90+ Days'),
+    ], string='Aging', readonly=True)
+
+    currency_id = fields.Many2one('res.currency', string='Currency', readonly=True)
+
+    amount_total = fields.Monetary(string='Total Amount', readonly=True)
+    amount_residual = fields.Monetary(string='Amount Due', readonly=True)
+    amount_paid = fields.Monetary(string='Amount Paid', readonly=True)
+    invoice_count = fields.Integer(string='# Invoices', readonly=True)
+
+    def _query(self):
+        """
+        Aggregation query materialized by the view.
+        Archived academic years are read from the history table: reports
+        keep covering every year while the invoice table stays small.
+        """
+        return """
+            SELECT row_number() OVER (
+                       ORDER BY inv.academic_year, inv.grade_level, inv.semester,
+                                inv.state, inv.aging_bucket, inv.currency_id
+                   ) AS id,
+                   inv.grade_level,
+                   inv.semester,
+                   inv.academic_year,
+                   inv.state,
+                   inv.aging_bucket,
+                   inv.currency_id,
+                   SUM(inv.amount_total) AS amount_total,
+                   SUM(inv.amount_residual) AS amount_residual,
+                   SUM(inv.amount_total - inv.amount_residual) AS amount_paid,
+                   COUNT(*) AS invoice_count
+              FROM (
+                    SELECT grade_level, semester, academic_year, state, aging_bucket,
+                           currency_id, amount_total, amount_residual
+                      FROM school_student_invoice
+                     UNION ALL
+                    SELECT grade_level, semester, academic_year, state, 'current',
+                           currency_id, amount_total, amount_residual
+                      FROM school_student_invoice_history
+                   ) inv
+          GROUP BY inv.grade_level, inv.semester, inv.academic_year,
+                   inv.state, inv.aging_bucket, inv.currency_id
+        """
+
+    def init(self):
+        self.env.cr.execute("DROP MATERIALIZED VIEW IF EXISTS %s" % self._table)
+        self.env.cr.execute("CREATE MATERIALIZED VIEW %s AS (%s)" % (self._table, self._query()))
+        # A unique index is required by REFRESH MATERIALIZED VIEW CONCURRENTLY
+        self.env.cr.execute("CREATE UNIQUE INDEX %s_id_idx ON %s (id)" % (self._table, self._table))
+
+    @api.model
+    def refresh_summary(self):
+        """
+        Cron job rebuilding the totals.
+        CONCURRENTLY lets the reports keep reading the previous snapshot.
+        """
+        self.env['school.student.invoice'].flush_model()
+        self.env['school.student.invoice.history'].flush_model()
+        self.env.cr.execute("REFRESH MATERIALIZED VIEW CONCURRENTLY %s" % self._table)
+        self.invalidate_model()
+        _logger.info('Revenue summary refreshed')
+        return True
+
+    @api.model
+    def _trigger_refresh(self):
+        """Schedule an asynchronous refresh after a bulk change of invoices"""
+        cron = self.env.ref('school_fee_management.ir_cron_refresh_revenue_summary', raise_if_not_found=False)
+        if cron:
+            cron._trigger()
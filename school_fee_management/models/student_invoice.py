@@ -2,11 +2,39 @@
 
 from odoo import models, fields, api, _
 from odoo.exceptions import ValidationError, UserError
+from odoo.tools import SQL, split_every
+from collections import defaultdict
 from datetime import datetime, timedelta
 import logging
+import time
 
 _logger = logging.getLogger(__name__)
 
+# Number of students turned into invoices per create() call
+GENERATION_BATCH_SIZE = 500
+
+# Number of invoices flipped to overdue per UPDATE statement
+OVERDUE_UPDATE_CHUNK_SIZE = 5000
+
+# Number of queued invoices emailed per run of the send cron
+SEND_BATCH_SIZE = 200
+
+# Denormalized student invoice fields and their account.move source
+MOVE_SYNC_FIELDS = {
+    'invoice_date': 'invoice_date',
+    'due_date': 'invoice_date_due',
+    'amount_total': 'amount_total',
+    'amount_residual': 'amount_residual',
+    'currency_id': 'currency_id',
+    'invoice_state': 'state',
+}
+
+# Key of the move ids whose student invoices are refreshed before commit
+MOVE_SYNC_PRECOMMIT_KEY = 'school_fee_management.dirty_move_ids'
+
+# Number of invoices refreshed per run of the accounting sync cron
+MOVE_SYNC_BATCH_SIZE = 5000
+
 
 class StudentInvoice(models.Model):
     """
@@ -27,7 +55,7 @@ class StudentInvoice(models.Model):
     """
     _name = 'school.student.invoice'
     _description = 'Student Invoice'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['school.audit.mixin', 'mail.thread', 'mail.activity.mixin', 'school.pdf.cache.mixin']
     _order = 'invoice_date desc, id desc'
     _rec_name = 'display_name'
 
@@ -62,9 +90,12 @@ class StudentInvoice(models.Model):
 
     # Denormalized fields for performance
     # WHY DENORMALIZE? Avoids joins when displaying lists
+    # Copied from the accounting invoice when it is linked; later changes of
+    # the move are refreshed in one UPDATE per transaction (_mark_moves_dirty)
+    # instead of a related-field recompute cascade inside every accounting write
     invoice_date = fields.Date(
         string='Invoice Date',
-        related='invoice_id.invoice_date',
+        compute='_compute_move_fields',
         store=True,
         index=True,  # INDEX: Fast date range filtering in reports
         readonly=True
@@ -72,32 +103,35 @@ class StudentInvoice(models.Model):
 
     due_date = fields.Date(
         string='Due Date',
-        related='invoice_id.invoice_date_due',
+        compute='_compute_move_fields',
         store=True,
         readonly=True
     )
 
     amount_total = fields.Monetary(
         string='Total Amount',
-        related='invoice_id.amount_total',
+        compute='_compute_move_fields',
         store=True,
         readonly=True
     )
 
     amount_residual = fields.Monetary(
         string='Amount Due',
-        related='invoice_id.amount_residual',
+        compute='_compute_move_fields',
         store=True,
         readonly=True
     )
 
     currency_id = fields.Many2one(
         'res.currency',
-        related='invoice_id.currency_id',
+        compute='_compute_move_fields',
         store=True,
         readonly=True
     )
 
+    # Set in 'cron' propagation mode on invoices whose move changed
+    move_sync_pending = fields.Boolean(string='Accounting Sync Pending', copy=False, readonly=True)
+
     # State management with proper workflow
     state = fields.Selection([
         ('draft', 'Draft'),
@@ -126,6 +160,9 @@ class StudentInvoice(models.Model):
 
     academic_year = fields.Char(string='Academic Year', default='2024-2025')
 
+    # Set on invoices of monthly / quarterly fees instead of the semester
+    billing_period_start = fields.Date(string='Billing Period', readonly=True, copy=False)
+
     # Computed fields with proper dependencies
     display_name = fields.Char(
         string='Display Name',
@@ -133,15 +170,33 @@ class StudentInvoice(models.Model):
         store=True
     )
 
+    # Stored overdue fields: sortable, groupable and indexed.
+    # The values depend on today's date, so the daily cron refreshes them in
+    # bulk (see _refresh_overdue_fields); the compute keeps them correct when
+    # the due date, residual or state of an invoice changes in between.
     is_overdue = fields.Boolean(
         string='Is Overdue',
         compute='_compute_is_overdue',
-        search='_search_is_overdue'  # Makes field searchable
+        store=True,
+        index=True  # INDEX: Fast overdue filtering in kanban and portal
     )
 
     days_overdue = fields.Integer(
         string='Days Overdue',
-        compute='_compute_is_overdue'
+        compute='_compute_is_overdue',
+        store=True
+    )
+
+    aging_bucket = fields.Selection([
+        ('current', 'Not Overdue'),
+        ('0_30', '0-30 Days'),
+        ('31_60', '31-60 Days'),
+        ('61_90', '61-90 Days'),
+        ('90_plus', '90+ Days'),
+    ], string='Aging',
+        compute='_compute_is_overdue',
+        store=True,
+        index=True  # INDEX: Fast grouping by overdue bucket in reports
     )
 
     payment_percentage = fields.Float(
@@ -150,13 +205,74 @@ class StudentInvoice(models.Model):
         store=True
     )
 
+    # Mass-send queue: invoices waiting for the send cron and its outcome
+    send_state = fields.Selection([
+        ('queued', 'Queued'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ], string='Email Status',
+        index=True,  # INDEX: Fast lookup of queued invoices by the send cron
+        copy=False,
+        readonly=True)
+
+    send_error = fields.Text(string='Email Error', copy=False, readonly=True)
+
+    payment_transaction_ids = fields.One2many(
+        'school.payment.transaction',
+        'student_invoice_id',
+        string='Payment Transactions'
+    )
+
     # Related fields for easy access
     invoice_state = fields.Selection(
-        related='invoice_id.state',
+        selection=lambda self: self.env['account.move']._fields['state'].selection,
+        compute='_compute_move_fields',
         string='Invoice State',
         store=True
     )
 
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        records._link_moves()
+        return records
+
+    def write(self, vals):
+        res = super().write(vals)
+        if 'invoice_id' in vals:
+            self._link_moves()
+        return res
+
+    def _link_moves(self):
+        """
+        Point the accounting moves back to their student invoice, which
+        flags them as school invoices (account.move.is_school_invoice).
+        One UPDATE for the whole recordset.
+        """
+        if not self:
+            return
+        self.flush_recordset(['invoice_id'])
+        self.env.cr.execute("""
+            UPDATE account_move move
+               SET student_invoice_id = inv.id
+              FROM school_student_invoice inv
+             WHERE inv.id = ANY(%s)
+               AND move.id = inv.invoice_id
+               AND move.student_invoice_id IS DISTINCT FROM inv.id
+         RETURNING move.id
+        """, [self.ids])
+        moves = self.env['account.move'].browse([row[0] for row in self.env.cr.fetchall()])
+        moves.invalidate_recordset(['student_invoice_id'])
+        moves.modified(['student_invoice_id'])
+
+    @api.depends('invoice_id')
+    def _compute_move_fields(self):
+        """Copy the denormalized accounting values when the invoice is linked"""
+        for record in self:
+            move = record.invoice_id
+            for fname, move_fname in MOVE_SYNC_FIELDS.items():
+                record[fname] = move[move_fname]
+
     @api.depends('student_id', 'invoice_id')
     def _compute_display_name(self):
         """Generate user-friendly display name"""
@@ -178,43 +294,78 @@ class StudentInvoice(models.Model):
     @api.depends('due_date', 'state', 'amount_residual')
     def _compute_is_overdue(self):
         """
-        Determine if invoice is overdue.
+        Determine if invoice is overdue and in which aging bucket.
         Used in kanban views and reports.
         """
         today = fields.Date.today()
         for record in self:
-            if record.due_date and record.amount_residual > 0 and record.state not in ['paid', 'cancelled']:
-                if record.due_date < today:
-                    record.is_overdue = True
-                    record.days_overdue = (today - record.due_date).days
-                else:
-                    record.is_overdue = False
-                    record.days_overdue = 0
+            if (record.due_date and record.due_date < today and record.amount_residual > 0
+                    and record.state not in ['paid', 'cancelled']):
+                record.is_overdue = True
+                record.days_overdue = (today - record.due_date).days
             else:
                 record.is_overdue = False
                 record.days_overdue = 0
+            record.aging_bucket = self._get_aging_bucket(record.is_overdue, record.days_overdue)
 
-    def _search_is_overdue(self, operator, value):
+    @api.model
+    def _get_aging_bucket(self, is_overdue, days_overdue):
+        """Aging bucket of an invoice, kept in line with _refresh_overdue_fields"""
+        if not is_overdue:
+            return 'current'
+        if days_overdue <= 30:
+            return '0_30'
+        if days_overdue <= 60:
+            return '31_60'
+        if days_overdue <= 90:
+            return '61_90'
+        return '90_plus'
+
+    @api.model
+    def _refresh_overdue_fields(self):
         """
-        Make is_overdue searchable in domain filters.
-        Example: [('is_overdue', '=', True)]
+        Bulk refresh of the stored overdue fields for the current date.
+
+        A single UPDATE touches only the invoices that are overdue today or
+        were flagged overdue before, and only when a value actually changes.
         """
         today = fields.Date.today()
-        if (operator == '=' and value) or (operator == '!=' and not value):
-            # Search for overdue invoices
-            return [
-                ('due_date', '<', today),
-                ('amount_residual', '>', 0),
-                ('state', 'not in', ['paid', 'cancelled'])
-            ]
-        else:
-            # Search for not overdue invoices
-            return ['|', '|', '|',
-                    ('due_date', '>=', today),
-                    ('amount_residual', '=', 0),
-                    ('state', '=', 'paid'),
-                    ('state', '=', 'cancelled')
-                    ]
+        self.flush_model(['due_date', 'amount_residual', 'state', 'is_overdue', 'days_overdue', 'aging_bucket'])
+        self.env.cr.execute("""
+            UPDATE school_student_invoice inv
+               SET is_overdue = data.is_overdue,
+                   days_overdue = data.days_overdue,
+                   aging_bucket = CASE
+                        WHEN NOT data.is_overdue THEN 'current'
+                        WHEN data.days_overdue <= 30 THEN '0_30'
+                        WHEN data.days_overdue <= 60 THEN '31_60'
+                        WHEN data.days_overdue <= 90 THEN '61_90'
+                        ELSE '90_plus'
+                   END
+              FROM (
+                    SELECT id,
+                           overdue AS is_overdue,
+                           CASE WHEN overdue THEN %(today)s - due_date ELSE 0 END AS days_overdue
+                      FROM (
+                            SELECT id, due_date,
+                                   COALESCE(due_date < %(today)s AND amount_residual > 0
+                                            AND state NOT IN ('paid', 'cancelled'), FALSE) AS overdue
+                              FROM school_student_invoice
+                             WHERE is_overdue
+                                OR (due_date < %(today)s AND amount_residual > 0
+                                    AND state NOT IN ('paid', 'cancelled'))
+                           ) candidates
+                   ) data
+             WHERE inv.id = data.id
+               AND (inv.is_overdue IS DISTINCT FROM data.is_overdue
+                    OR inv.days_overdue IS DISTINCT FROM data.days_overdue)
+         RETURNING inv.id
+        """, {'today': today})
+        refreshed = self.browse([row[0] for row in self.env.cr.fetchall()])
+        refreshed.invalidate_recordset(['is_overdue', 'days_overdue', 'aging_bucket'])
+        refreshed.modified(['is_overdue', 'days_overdue', 'aging_bucket'])
+        _logger.info(f'Refreshed overdue fields of {len(refreshed)} invoices')
+        return refreshed
 
     @api.depends('amount_total', 'amount_residual')
     def _compute_payment_percentage(self):
@@ -269,6 +420,149 @@ class StudentInvoice(models.Model):
             }
         }
 
+    def action_mass_send(self):
+        """
+        Send many draft invoices at once.
+
+        PERFORMANCE OPTIMIZATION:
+        - All draft accounting invoices are posted with one action_post()
+        - One write moves the invoices to 'sent' and queues them
+        - Emails and PDFs are rendered later by the send cron, in chunks,
+          so neither the request nor the mail server is saturated
+        """
+        invoices = self.filtered(lambda r: r.state == 'draft')
+        if not invoices:
+            raise UserError(_('Only draft invoices can be sent.'))
+
+        draft_moves = invoices.invoice_id.filtered(lambda m: m.state == 'draft')
+        if draft_moves:
+            draft_moves.action_post()
+
+        invoices.write({'state': 'sent', 'send_state': 'queued', 'send_error': False})
+        cron = self.env.ref('school_fee_management.ir_cron_send_invoice_queue', raise_if_not_found=False)
+        if cron:
+            cron._trigger()
+
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'type': 'success',
+                'message': _('%s invoices queued for sending.') % len(invoices),
+                'next': {'type': 'ir.actions.act_window_close'},
+            },
+        }
+
+    @api.model
+    def cron_process_send_queue(self, batch_size=SEND_BATCH_SIZE):
+        """
+        Scheduled action rendering and emailing queued invoices.
+
+        Each invoice is sent under its own savepoint: a failure is recorded
+        on the invoice and does not stop the chunk. Emails are posted on the
+        accounting invoices without forced send: the mail cron delivers them
+        at its pace.
+        Rendering the attached PDF pre-warms the portal PDF cache.
+        """
+        template = self.env.ref('account.email_template_edi_invoice', raise_if_not_found=False)
+        queued = self.search([('send_state', '=', 'queued')], order='id', limit=batch_size)
+        if not queued:
+            return True
+
+        started_at = time.perf_counter()
+        sent = self.browse()
+        failures = {}
+        for invoice in queued:
+            try:
+                with self.env.cr.savepoint():
+                    invoice._send_invoice_email(template)
+                sent |= invoice
+            except Exception as e:
+                failures[invoice] = str(e)
+                _logger.error(f'Error sending invoice {invoice.display_name}: {str(e)}')
+
+        if sent:
+            sent.write({'send_state': 'sent', 'send_error': False})
+            sent.invoice_id.write({'is_move_sent': True})
+        for invoice, error in failures.items():
+            invoice.write({'send_state': 'failed', 'send_error': error})
+        self.env.cr.commit()
+
+        duration = time.perf_counter() - started_at
+        _logger.info(
+            f'Sent {len(sent)}/{len(queued)} invoices in {duration:.2f}s, {len(failures)} failures'
+        )
+        remaining = self.search_count([('send_state', '=', 'queued')])
+        self.env['ir.cron']._notify_progress(done=len(queued), remaining=remaining)
+        return True
+
+    def _send_invoice_email(self, template):
+        """
+        Queue the invoice email of one student invoice.
+        The email is posted on the accounting invoice: it leaves a trace in
+        its chatter and notifies its followers, and the mail queue sends it.
+        The cached PDF is attached instead of letting the template render the
+        report again: sending also warms the cache used by the portal.
+        """
+        self.ensure_one()
+        if not template:
+            raise UserError(_('The invoice email template is missing.'))
+        attachment = self._get_cached_pdf()
+        move = self.invoice_id
+        values = template._generate_template(
+            move.ids, ('subject', 'body_html', 'email_from', 'email_to', 'partner_to', 'reply_to'),
+            find_or_create_partners=True,
+        )[move.id]
+        move.message_post(
+            body=values.get('body_html', ''),
+            body_is_html=True,
+            subject=values.get('subject'),
+            email_from=values.get('email_from'),
+            reply_to=values.get('reply_to'),
+            partner_ids=values.get('partner_ids', []),
+            attachment_ids=attachment.ids,
+            message_type='comment',
+            subtype_xmlid='mail.mt_comment',
+            force_send=False,
+            mail_auto_delete=template.auto_delete,
+        )
+        self.message_post(
+            body=_('Invoice sent to parent: %s') % self.parent_id.name,
+            subject=_('Invoice Sent')
+        )
+
+    def _get_pdf_source(self):
+        self.ensure_one()
+        move = self.invoice_id
+        return 'account.account_invoices', move if move.state == 'posted' else move.browse()
+
+    def _get_pdf_cache_key_parts(self):
+        move = self.invoice_id
+        return (move.id, move.name, move.state, move.payment_state,
+                move.amount_total, move.amount_residual, move.invoice_date_due,
+                move.write_date, self.write_date)
+
+    def _get_pdf_filename(self):
+        return '%s.pdf' % (self.invoice_id.name or self.display_name).replace('/', '_')
+
+    def action_download_pdf(self):
+        """Download the invoice PDF from the cache, rendering it only if stale"""
+        self.ensure_one()
+        attachment = self._get_cached_pdf()
+        return {
+            'type': 'ir.actions.act_url',
+            'url': '/web/content/%s?download=true' % attachment.id,
+            'target': 'self',
+        }
+
+    def action_retry_send(self):
+        """Queue failed invoices again"""
+        failed = self.filtered(lambda r: r.send_state == 'failed')
+        failed.write({'send_state': 'queued', 'send_error': False})
+        cron = self.env.ref('school_fee_management.ir_cron_send_invoice_queue', raise_if_not_found=False)
+        if cron:
+            cron._trigger()
+
     def action_mark_paid(self):
         """Mark invoice as paid (for manual reconciliation)"""
         self.ensure_one()
@@ -315,122 +609,497 @@ class StudentInvoice(models.Model):
         }
 
     @api.model
-    def auto_update_overdue_status(self):
+    def auto_update_overdue_status(self, use_sql=True):
         """
         Cron job to automatically mark invoices as overdue.
         Runs daily to update status based on due dates.
+
+        PERFORMANCE OPTIMIZATION:
+        - SQL mode (default) flips the state with chunked UPDATE statements
+          served by the partial overdue index
+        - No per-record tracking values, chatter messages or follower lookups:
+          a single summary is posted for the whole run
+          (see _post_overdue_summary)
+
+        The SQL mode bypasses write(): the state change does not appear in
+        the tracking history of the invoices. In audit mode it is written to
+        the audit log instead.
+        - ORM cache is invalidated and dependent fields are marked for
+          recomputation, so the ORM stays consistent with the database
+        - Stored overdue/aging fields are then refreshed in bulk
+
+        Args:
+            use_sql: False falls back to the ORM write with full tracking
         """
         today = fields.Date.today()
-        overdue_invoices = self.search([
+        domain = [
             ('due_date', '<', today),
             ('amount_residual', '>', 0),
             ('state', 'in', ['sent', 'partial']),
-        ])
+        ]
+
+        if not use_sql:
+            overdue_invoices = self.search(domain)
+            overdue_invoices.write({'state': 'overdue'})
+            self._post_overdue_summary(len(overdue_invoices), today)
+            self._refresh_overdue_fields()
+            self.env['res.partner']._refresh_children_next_due_date()
+            self.env['school.revenue.summary']._trigger_refresh()
+            return True
+
+        self.flush_model(['due_date', 'amount_residual', 'state'])
+        audit_mode = self._is_audit_mode()
+        state_labels = dict(self._fields['state'].selection)
+        updated_ids = []
+        while True:
+            self.env.cr.execute("""
+                UPDATE school_student_invoice inv
+                   SET state = 'overdue',
+                       write_uid = %s,
+                       write_date = (now() at time zone 'UTC')
+                  FROM (
+                        SELECT id, state
+                          FROM school_student_invoice
+                         WHERE due_date < %s
+                           AND amount_residual > 0
+                           AND state IN ('sent', 'partial')
+                         LIMIT %s
+                       ) old
+                 WHERE inv.id = old.id
+             RETURNING inv.id, old.state
+            """, [self.env.uid, today, OVERDUE_UPDATE_CHUNK_SIZE])
+            rows = self.env.cr.fetchall()
+            if not rows:
+                break
+            updated_ids.extend(invoice_id for invoice_id, _old_state in rows)
+            # Not written through write(): audit the state change here
+            if audit_mode:
+                self.env['school.audit.log'].sudo()._log_changes([
+                    (self._name, invoice_id, 'state', self._fields['state'].string,
+                     state_labels[old_state], state_labels['overdue'])
+                    for invoice_id, old_state in rows
+                ])
 
-        overdue_invoices.write({'state': 'overdue'})
-        _logger.info(f'Updated {len(overdue_invoices)} invoices to overdue status')
+        overdue_invoices = self.browse(updated_ids)
+        overdue_invoices.invalidate_recordset(['state', 'write_uid', 'write_date'])
+        overdue_invoices.modified(['state'])
 
+        self._post_overdue_summary(len(updated_ids), today)
+        self._refresh_overdue_fields()
+        self.env['res.partner']._refresh_children_next_due_date()
+        self.env['school.revenue.summary']._trigger_refresh()
         return True
 
+    @api.model
+    def _post_overdue_summary(self, count, today):
+        """
+        Single summary of an overdue run: logged, and posted in the School
+        Finance channel when invoices were marked overdue.
+        """
+        _logger.info(f'Overdue status update on {today}: {count} invoices marked overdue by {self.env.user.name}')
+        if not count:
+            return
+        channel = self.env.ref('school_fee_management.channel_school_finance', raise_if_not_found=False)
+        if channel:
+            channel.sudo().message_post(
+                body=_('%(count)s student invoices were marked overdue on %(date)s.', count=count, date=today),
+                message_type='comment',
+                subtype_xmlid='mail.mt_comment',
+            )
+
     @api.model
     def cron_generate_semester_invoices(self, semester='fall', academic_year='2024-2025'):
         """
         Scheduled action to bulk generate invoices at semester start.
 
-        PERFORMANCE OPTIMIZATION:
-        - Batch processes students to avoid memory issues
-        - Uses create_multi for efficient bulk creation
-        - Single search for all active students
-        - Commits in batches to avoid long transactions
+        The work is fanned out into school.invoice.generation.job records,
+        one per grade level, processed in parallel by the worker crons. Each
+        job commits its cursor with every chunk, so a killed or timed-out run
+        resumes where it stopped instead of rescanning every student.
 
         Args:
             semester: 'fall', 'spring', or 'summer'
             academic_year: Academic year string (e.g., '2024-2025')
         """
-        # Find all active students
-        students = self.env['res.partner'].search([
-            ('is_student', '=', True),
-            ('active', '=', True),
-            ('grade_level', '!=', False)
-        ])
+        Job = self.env['school.invoice.generation.job']
+        jobs = Job._prepare_jobs(semester, academic_year)
+        _logger.info(f'Queued {len(jobs)} invoice generation jobs for {semester} {academic_year}')
+        Job._trigger_workers()
+        return True
 
-        if not students:
-            _logger.warning('No students found for invoice generation')
-            return True
+    @api.model
+    def _prepare_semester_line_payloads(self, semester, academic_year, amount_memo=None):
+        """
+        Build the invoice line payload of every grade level in one pass.
 
-        _logger.info(f'Starting invoice generation for {len(students)} students')
+        Fee structures and their final amounts come from the fee structure
+        lookup cache (ormcache): once a year's payloads are cached, they are
+        served without any query until a fee structure or fee type change
+        clears the cache.
 
-        invoice_vals_list = []
-        created_count = 0
-        error_count = 0
+        Returns:
+            dict mapping grade_level to a list of (invoice line values,
+            sibling discount percentage) tuples
+        """
+        payloads = defaultdict(list)
+        for grade_level, _structure_id, fee_type_name, amount, sibling_percentage in \
+                self.env['school.fee.structure']._get_line_payloads(academic_year, amount_memo=amount_memo):
+            payloads[grade_level].append(({
+                'name': f'{fee_type_name} - {semester.title()} Semester',
+                'quantity': 1,
+                'price_unit': amount,
+                'tax_ids': [(6, 0, [])],  # No taxes by default
+            }, sibling_percentage))
+        return payloads
 
-        for student in students:
-            try:
-                # Find applicable fee structures for this student's grade
-                fee_structures = self.env['school.fee.structure'].search([
-                    ('grade_level', '=', student.grade_level),
-                    ('active', '=', True),
-                    ('academic_year', '=', academic_year),
-                    ('recurrence', 'in', ['one_time', 'semester', 'annual'])
-                ])
+    @api.model
+    def _get_invoiced_student_ids(self, student_ids, semester, academic_year):
+        """
+        Return the set of students that already have a non-cancelled invoice
+        for this semester and academic year, live or archived.
+        One GROUP BY query per table, the live one served by the semester
+        idempotency index.
+        """
+        domain = [
+            ('student_id', 'in', student_ids),
+            ('semester', '=', semester),
+            ('academic_year', '=', academic_year),
+            ('state', '!=', 'cancelled'),
+        ]
+        invoiced_ids = {student.id for student, in self.sudo()._read_group(domain, ['student_id'])}
+        History = self.env['school.student.invoice.history'].sudo()
+        invoiced_ids.update(student.id for student, in History._read_group(domain, ['student_id']))
+        return invoiced_ids
 
-                if not fee_structures:
-                    _logger.warning(f'No fee structures found for student {student.name}, grade {student.grade_level}')
-                    continue
+    @api.model
+    def _generate_semester_invoices(self, students, semester, academic_year, batch_size=GENERATION_BATCH_SIZE,
+                                    amount_memo=None):
+        """
+        Generation engine shared by the cron and manual runs.
+
+        Students are processed in batches: one account.move create() and one
+        school.student.invoice create() per batch, each under a savepoint.
+        Students already invoiced for the semester are skipped with a single
+        indexed lookup per batch, which makes re-runs idempotent.
+        Scholarship and sibling discounts of a batch are read with one query.
+        When a batch fails it is replayed student by student so a single bad
+        record does not block its neighbours. Nothing is committed here, the
+        caller decides when the work becomes durable.
+
+        Returns:
+            dict with created/skipped/already_invoiced/errors counts, error
+            messages, duration and students/sec
+        """
+        started_at = time.perf_counter()
+        payloads = self._prepare_semester_line_payloads(semester, academic_year, amount_memo)
+        FeeStructure = self.env['school.fee.structure']
+        invoice_date = fields.Date.today()
+        due_date = invoice_date + timedelta(days=30)
+        stats = {'created': 0, 'skipped': 0, 'already_invoiced': 0, 'errors': 0, 'error_messages': []}
+
+        def prepare_move_vals(student, discount_rates):
+            lines = []
+            for vals, sibling_percentage in payloads[student.grade_level]:
+                vals = dict(vals)
+                if student.id in discount_rates:
+                    vals['price_unit'] = FeeStructure._apply_student_discounts(
+                        vals['price_unit'], sibling_percentage, *discount_rates[student.id]
+                    )
+                lines.append((0, 0, vals))
+            return {
+                'move_type': 'out_invoice',
+                'partner_id': student.parent_id.id if student.parent_id else student.id,
+                'invoice_date': invoice_date,
+                'invoice_date_due': due_date,
+                'invoice_line_ids': lines,
+            }
 
-                # Create invoice in accounting module
-                invoice_line_vals = []
-                for fee_struct in fee_structures:
-                    final_amount = fee_struct.calculate_final_amount()
-                    invoice_line_vals.append((0, 0, {
-                        'name': f'{fee_struct.fee_type_id.name} - {semester.title()} Semester',
-                        'quantity': 1,
-                        'price_unit': final_amount,
-                        'tax_ids': [(6, 0, [])],  # No taxes by default
-                    }))
-
-                # Create the accounting invoice
-                invoice = self.env['account.move'].create({
-                    'move_type': 'out_invoice',
-                    'partner_id': student.parent_id.id if student.parent_id else student.id,
-                    'invoice_date': fields.Date.today(),
-                    'invoice_date_due': fields.Date.today() + timedelta(days=30),
-                    'invoice_line_ids': invoice_line_vals,
-                })
-
-                # Create student invoice record
-                invoice_vals_list.append({
+        def create_invoices(batch_students, discount_rates):
+            with self.env.cr.savepoint():
+                invoices = self.env['account.move'].create([
+                    prepare_move_vals(student, discount_rates) for student in batch_students
+                ])
+                self.create([{
                     'student_id': student.id,
                     'invoice_id': invoice.id,
                     'semester': semester,
                     'academic_year': academic_year,
                     'state': 'draft',
-                })
+                } for student, invoice in zip(batch_students, invoices)])
+            return len(invoices)
 
-                created_count += 1
+        for batch in split_every(batch_size, students.ids, self.env['res.partner'].browse):
+            invoiced_ids = self._get_invoiced_student_ids(batch.ids, semester, academic_year)
+            batch_students = []
+            for student in batch:
+                if student.id in invoiced_ids:
+                    stats['already_invoiced'] += 1
+                    continue
+                if not payloads.get(student.grade_level):
+                    _logger.warning(f'No fee structures found for student {student.name}, grade {student.grade_level}')
+                    stats['skipped'] += 1
+                    continue
+                batch_students.append(student)
 
-                # Batch commit every 50 invoices for performance
-                if len(invoice_vals_list) >= 50:
-                    self.create(invoice_vals_list)
-                    self.env.cr.commit()
-                    _logger.info(f'Committed batch of {len(invoice_vals_list)} invoices')
-                    invoice_vals_list = []
+            if not batch_students:
+                continue
 
-            except Exception as e:
-                error_count += 1
-                _logger.error(f'Error generating invoice for student {student.name}: {str(e)}')
+            discount_rates = FeeStructure._get_student_discount_rates(
+                self.env['res.partner'].browse([student.id for student in batch_students])
+            )
+            try:
+                stats['created'] += create_invoices(batch_students, discount_rates)
                 continue
+            except Exception as e:
+                _logger.warning(f'Batch of {len(batch_students)} invoices failed, retrying one by one: {str(e)}')
+
+            for student in batch_students:
+                try:
+                    stats['created'] += create_invoices([student], discount_rates)
+                except Exception as e:
+                    message = f'Error generating invoice for student {student.name} (id {student.id}): {str(e)}'
+                    _logger.error(message)
+                    stats['errors'] += 1
+                    stats['error_messages'].append(message)
 
-        # Create remaining invoices
-        if invoice_vals_list:
-            self.create(invoice_vals_list)
+        stats['duration'] = time.perf_counter() - started_at
+        stats['rate'] = len(students) / stats['duration'] if stats['duration'] else 0.0
+        return stats
+
+    # ------------------------------------------------------------------
+    # Deferred propagation of the accounting values
+    # ------------------------------------------------------------------
+
+    @api.model
+    def _get_move_sync_mode(self):
+        """
+        How move changes reach the denormalized columns:
+        - 'precommit' (default): refreshed at the end of the transaction
+        - 'cron': invoices are flagged and refreshed by the sync cron
+        """
+        return self.env['ir.config_parameter'].sudo().get_param(
+            'school_fee_management.move_sync_mode', 'precommit')
+
+    @api.model
+    def _mark_moves_dirty(self, move_ids):
+        """
+        Schedule the refresh of the invoices of these accounting moves.
+
+        Nothing is recomputed here. In 'precommit' mode the move ids are
+        collected for the whole transaction and refreshed by
+        _sync_dirty_moves when the cursor is flushed before commit: one
+        set-based UPDATE, however many writes and reconciliations touched
+        the moves. Reads in the same transaction still return the previous
+        values until then.
+        """
+        if not move_ids:
+            return
+        if self._get_move_sync_mode() == 'cron':
+            self.env.cr.execute("""
+                UPDATE school_student_invoice
+                   SET move_sync_pending = TRUE
+                 WHERE invoice_id = ANY(%s)
+                   AND move_sync_pending IS NOT TRUE
+            """, [list(move_ids)])
+            self.invalidate_model(['move_sync_pending'])
+            return
+
+        data = self.env.cr.precommit.data
+        if MOVE_SYNC_PRECOMMIT_KEY not in data:
+            data[MOVE_SYNC_PRECOMMIT_KEY] = set()
+            self.env.cr.precommit.add(self._sync_dirty_moves)
+        data[MOVE_SYNC_PRECOMMIT_KEY].update(move_ids)
+
+    def _sync_dirty_moves(self):
+        """Refresh the invoices of the moves changed in this transaction"""
+        move_ids = self.env.cr.precommit.data.pop(MOVE_SYNC_PRECOMMIT_KEY, None)
+        if move_ids:
+            self._sync_move_fields(list(move_ids))
+
+    @api.model
+    def _sync_move_fields(self, move_ids=None):
+        """
+        Refresh the denormalized accounting columns with one set-based UPDATE.
+
+        Used before commit ('precommit' mode), by the sync cron ('cron' mode)
+        and the drift checker. Only rows whose values differ are written,
+        with a new write_date (portal ETags, PDF cache key); the ORM is then
+        told which fields changed so that dependent stored fields (overdue
+        flags, payment percentage, partner balances) are recomputed in batch.
+
+        Args:
+            move_ids: account.move ids to refresh, all flagged invoices if None
+        Returns:
+            the refreshed school.student.invoice records
+        """
+        self.env['account.move'].flush_model(list(MOVE_SYNC_FIELDS.values()))
+        self.flush_model(list(MOVE_SYNC_FIELDS) + ['invoice_id', 'move_sync_pending'])
+        if move_ids is not None:
+            scope = SQL("inv.invoice_id = ANY(%s)", list(move_ids))
+        else:
+            scope = SQL("inv.move_sync_pending")
+        self.env.cr.execute(SQL("""
+            UPDATE school_student_invoice inv
+               SET invoice_date = move.invoice_date,
+                   due_date = move.invoice_date_due,
+                   amount_total = move.amount_total,
+                   amount_residual = move.amount_residual,
+                   currency_id = move.currency_id,
+                   invoice_state = move.state,
+                   move_sync_pending = FALSE,
+                   write_date = NOW() AT TIME ZONE 'UTC',
+                   write_uid = %(uid)s
+              FROM account_move move
+             WHERE move.id = inv.invoice_id
+               AND %(scope)s
+               AND (inv.move_sync_pending
+                    OR inv.invoice_date IS DISTINCT FROM move.invoice_date
+                    OR inv.due_date IS DISTINCT FROM move.invoice_date_due
+                    OR inv.amount_total IS DISTINCT FROM move.amount_total
+                    OR inv.amount_residual IS DISTINCT FROM move.amount_residual
+                    OR inv.currency_id IS DISTINCT FROM move.currency_id
+                    OR inv.invoice_state IS DISTINCT FROM move.state)
+         RETURNING inv.id
+        """, uid=self.env.uid, scope=scope))
+        records = self.browse([row[0] for row in self.env.cr.fetchall()])
+        if records:
+            records.invalidate_recordset(list(MOVE_SYNC_FIELDS) + ['move_sync_pending', 'write_date', 'write_uid'])
+            records.modified(list(MOVE_SYNC_FIELDS))
+        return records
+
+    @api.model
+    def cron_sync_move_fields(self, batch_size=MOVE_SYNC_BATCH_SIZE):
+        """
+        Short-interval scheduled action of the 'cron' propagation mode:
+        refreshes the flagged invoices chunk by chunk, one commit per chunk.
+        """
+        started_at = time.perf_counter()
+        self.env.cr.execute("""
+            SELECT DISTINCT invoice_id
+              FROM school_student_invoice
+             WHERE move_sync_pending
+        """)
+        move_ids = [row[0] for row in self.env.cr.fetchall()]
+        refreshed = 0
+        for chunk in split_every(batch_size, move_ids):
+            refreshed += len(self._sync_move_fields(list(chunk)))
+            self.env.flush_all()
             self.env.cr.commit()
+        if move_ids:
+            duration = time.perf_counter() - started_at
+            _logger.info(f'Refreshed {refreshed} student invoices from {len(move_ids)} moves in {duration:.2f}s')
+        return True
 
-        _logger.info(
-            f'Invoice generation complete. Created: {created_count}, Errors: {error_count}'
+    @api.model
+    def cron_check_move_field_drift(self, fix=False):
+        """
+        Consistency checker: report student invoices whose denormalized
+        accounting columns differ from their move. Pending invoices of the
+        'cron' mode are not drift and are ignored.
+
+        Args:
+            fix: refresh the drifted invoices as well
+        Returns:
+            number of drifted invoices
+        """
+        self.env['account.move'].flush_model(list(MOVE_SYNC_FIELDS.values()))
+        self.flush_model(list(MOVE_SYNC_FIELDS) + ['invoice_id', 'move_sync_pending'])
+        self.env.cr.execute("""
+            SELECT inv.id, inv.invoice_id
+              FROM school_student_invoice inv
+              JOIN account_move move ON move.id = inv.invoice_id
+             WHERE inv.move_sync_pending IS NOT TRUE
+               AND (inv.invoice_date IS DISTINCT FROM move.invoice_date
+                    OR inv.due_date IS DISTINCT FROM move.invoice_date_due
+                    OR inv.amount_total IS DISTINCT FROM move.amount_total
+                    OR inv.amount_residual IS DISTINCT FROM move.amount_residual
+                    OR inv.currency_id IS DISTINCT FROM move.currency_id
+                    OR inv.invoice_state IS DISTINCT FROM move.state)
+        """)
+        rows = self.env.cr.fetchall()
+        if not rows:
+            _logger.info('No drift between student invoices and accounting moves')
+            return 0
+        _logger.warning(
+            f'{len(rows)} student invoices drifted from their accounting move, '
+            f'e.g. ids {[invoice_id for invoice_id, _move_id in rows[:20]]}'
         )
+        if fix:
+            self._sync_move_fields([move_id for _invoice_id, move_id in rows])
+        return len(rows)
 
-        return True
+    def init(self):
+        """
+        Partial indexes that _sql_constraints and index=True cannot express.
+
+        - Idempotency index: one non-cancelled invoice per student, semester
+          and academic year (cancelled invoices must not block re-invoicing)
+        - Overdue index: due_date of open invoices with a residual amount
+        - Open due index: due_date of unpaid invoices, used by the daily
+          refresh of the stored overdue fields
+        - Portal keyset index: (parent_id, invoice_date, id) serves each page
+          of the parent portal API as a single index range scan
+        - Sync index: invoices flagged for the accounting sync cron
+
+        Also backfills account_move.student_invoice_id of moves linked
+        before the back-reference was maintained.
+        """
+        # INDEX: Idempotent invoice generation, one lookup per batch
+        self.env.cr.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS school_student_invoice_semester_unique
+                ON school_student_invoice (student_id, semester, academic_year)
+             WHERE state != 'cancelled'
+        """)
+        # INDEX: Daily overdue cron only scans invoices that can become overdue
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS school_student_invoice_overdue_idx
+                ON school_student_invoice (due_date)
+             WHERE state IN ('sent', 'partial') AND amount_residual > 0
+        """)
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS school_student_invoice_open_due_idx
+                ON school_student_invoice (due_date)
+             WHERE state NOT IN ('paid', 'cancelled') AND amount_residual > 0
+        """)
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS school_student_invoice_parent_keyset_idx
+                ON school_student_invoice (parent_id, invoice_date DESC, id DESC)
+        """)
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS school_student_invoice_move_sync_idx
+                ON school_student_invoice (invoice_id)
+             WHERE move_sync_pending
+        """)
+        self.env.cr.execute("""
+            UPDATE account_move move
+               SET student_invoice_id = inv.id,
+                   is_school_invoice = TRUE
+              FROM school_student_invoice inv
+             WHERE move.id = inv.invoice_id
+               AND move.student_invoice_id IS NULL
+        """)
+
+    @api.constrains('student_id', 'semester', 'academic_year', 'state')
+    def _check_semester_unique(self):
+        """
+        Friendly error for the idempotency index.
+        Checks the whole recordset with one grouped query.
+        """
+        records = self.filtered(lambda r: r.semester and r.state != 'cancelled')
+        if not records:
+            return
+        duplicates = self.sudo()._read_group([
+            ('student_id', 'in', records.student_id.ids),
+            ('semester', 'in', list(set(records.mapped('semester')))),
+            ('academic_year', 'in', list(set(records.mapped('academic_year')))),
+            ('state', '!=', 'cancelled'),
+        ], ['student_id', 'semester', 'academic_year'], having=[('__count', '>', 1)])
+        if duplicates:
+            student, semester, academic_year = duplicates[0]
+            raise ValidationError(_(
+                '%(student)s already has an invoice for the %(semester)s semester of %(year)s.',
+                student=student.name, semester=semester, year=academic_year,
+            ))
 
     # SQL constraints for data integrity
     _sql_constraints = [
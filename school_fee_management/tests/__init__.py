@@ -0,0 +1,11 @@
+# -*- coding: utf-8 -*-
+
+from . import test_audit_log
+from . import test_benchmark
+from . import test_invoice_sync
+from . import test_student_invoice
+from . import test_overdue
+from . import test_payment_import
+from . import test_archive_academic_year
+from . import test_recurring_billing
+from . import test_payment_collection
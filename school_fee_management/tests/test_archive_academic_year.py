@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+
+from odoo.addons.account.tests.common import AccountTestInvoicingCommon
+from odoo.exceptions import UserError
+from odoo.tests import tagged
+from datetime import date
+
+ACADEMIC_YEAR = '2023-2024'
+
+
+@tagged('post_install', '-at_install')
+class TestArchiveAcademicYear(AccountTestInvoicingCommon):
+    """Closed academic years are moved to the history tables"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.parent = cls.env['res.partner'].create({'name': 'Archive Parent'})
+        cls.students = cls.env['res.partner'].create([{
+            'name': f'Archive Student {i}',
+            'is_student': True,
+            'student_id_number': f'ARCH{i:06d}',
+            'grade_level': 'grade_3',
+            'parent_id': cls.parent.id,
+        } for i in range(2)])
+
+    def create_student_invoice(self, student, state='sent'):
+        move = self.init_invoice(
+            'out_invoice', partner=self.parent, invoice_date=date(2023, 10, 1), amounts=[1000.0], post=True)
+        return self.env['school.student.invoice'].create({
+            'student_id': student.id,
+            'invoice_id': move.id,
+            'semester': 'fall',
+            'academic_year': ACADEMIC_YEAR,
+            'state': state,
+        })
+
+    def create_paid_invoice(self, student):
+        """Paid through a school payment transaction, reconciled with the move"""
+        invoice = self.create_student_invoice(student)
+        transaction = self.env['school.payment.transaction'].create({
+            'student_invoice_id': invoice.id,
+            'payment_date': date(2023, 10, 15),
+            'amount': 1000.0,
+            'currency_id': invoice.currency_id.id,
+            'payment_method': 'bank_transfer',
+        })
+        transaction.action_confirm()
+        transaction.action_reconcile()
+        self.assertEqual(invoice.state, 'paid')
+        return invoice, transaction
+
+    def archive(self):
+        wizard = self.env['school.archive.academic.year'].create({'academic_year': ACADEMIC_YEAR})
+        wizard.action_archive()
+        return wizard
+
+    def test_open_invoice_blocks_archive(self):
+        self.create_paid_invoice(self.students[0])
+        self.create_student_invoice(self.students[1])
+        with self.assertRaisesRegex(UserError, 'open or unpaid'):
+            self.archive()
+
+    def test_unpaid_move_blocks_archive(self):
+        # Marked paid by hand, the accounting invoice still has a residual
+        self.create_student_invoice(self.students[0], state='paid')
+        with self.assertRaisesRegex(UserError, 'open or unpaid'):
+            self.archive()
+
+    def test_pending_payment_blocks_archive(self):
+        invoice, _transaction = self.create_paid_invoice(self.students[0])
+        self.env['school.payment.transaction'].create({
+            'student_invoice_id': invoice.id,
+            'payment_date': date(2023, 10, 20),
+            'amount': 10.0,
+            'currency_id': invoice.currency_id.id,
+            'payment_method': 'bank_transfer',
+        })
+        with self.assertRaisesRegex(UserError, 'pending payment'):
+            self.archive()
+
+    def test_archive_moves_invoices_payments_and_audit_log(self):
+        # Fee structures of the year may stay: they do not keep the year open
+        fee_type = self.env['school.fee.type'].create({'name': 'Archive Tuition', 'code': 'ARCTUI'})
+        self.env['school.fee.structure'].create({
+            'fee_type_id': fee_type.id,
+            'grade_level': 'grade_3',
+            'academic_year': ACADEMIC_YEAR,
+            'amount': 1000.0,
+        })
+        invoice, transaction = self.create_paid_invoice(self.students[0])
+        move = invoice.invoice_id
+        invoice_id, transaction_id = invoice.id, transaction.id
+        AuditLog = self.env['school.audit.log']
+        AuditLog._log_changes([
+            ('school.student.invoice', invoice_id, 'state', 'Status', 'Sent', 'Paid'),
+            ('school.payment.transaction', transaction_id, 'state', 'Status', 'Confirmed', 'Reconciled'),
+        ])
+
+        wizard = self.archive()
+
+        self.assertEqual((wizard.archived_invoice_count, wizard.archived_transaction_count), (1, 1))
+        self.assertFalse(self.env['school.student.invoice'].browse(invoice_id).exists())
+        self.assertFalse(self.env['school.payment.transaction'].browse(transaction_id).exists())
+        invoice_history = self.env['school.student.invoice.history'].search([('original_id', '=', invoice_id)])
+        self.assertRecordValues(invoice_history, [{'state': 'paid', 'invoice_id': move.id, 'amount_residual': 0.0}])
+        self.assertEqual(invoice_history.transaction_ids.original_id, transaction_id)
+        self.assertFalse(move.student_invoice_id)
+
+        # Audit entries point at the history records, none at the deleted ids
+        self.assertEqual(len(AuditLog.search([('model', '=', 'school.student.invoice.history'),
+                                              ('res_id', '=', invoice_history.id)])), 1)
+        self.assertEqual(len(AuditLog.search([('model', '=', 'school.payment.transaction.history'),
+                                              ('res_id', '=', invoice_history.transaction_ids.id)])), 1)
+        self.assertFalse(AuditLog.search([
+            '|',
+            '&', ('model', '=', 'school.student.invoice'), ('res_id', '=', invoice_id),
+            '&', ('model', '=', 'school.payment.transaction'), ('res_id', '=', transaction_id),
+        ]))
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+
+from odoo.tests import TransactionCase, tagged
+
+
+@tagged('post_install', '-at_install')
+class TestAuditMode(TransactionCase):
+    """Audit mode records field changes instead of mail tracking values"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        fee_type = cls.env['school.fee.type'].create({'name': 'Audit Tuition', 'code': 'AUDTUI'})
+        cls.structure = cls.env['school.fee.structure'].create({
+            'fee_type_id': fee_type.id,
+            'grade_level': 'grade_1',
+            'academic_year': '2024-2025',
+            'amount': 1000.0,
+        })
+
+    def flush_tracking(self):
+        """Tracking values are created before commit"""
+        self.env.flush_all()
+        self.env.cr.precommit.run()
+
+    def tracking_value_count(self):
+        return self.env['mail.tracking.value'].sudo().search_count([
+            ('mail_message_id.model', '=', 'school.fee.structure'),
+            ('mail_message_id.res_id', '=', self.structure.id),
+        ])
+
+    def audit_logs(self):
+        return self.env['school.audit.log'].search([
+            ('model', '=', 'school.fee.structure'),
+            ('res_id', '=', self.structure.id),
+        ])
+
+    def test_audit_mode_replaces_tracking(self):
+        self.flush_tracking()
+        tracking_count = self.tracking_value_count()
+
+        self.structure.with_context(school_audit_log=True).write({'amount': 1200.0})
+        self.flush_tracking()
+
+        self.assertEqual(self.tracking_value_count(), tracking_count)
+        logs = self.audit_logs()
+        self.assertEqual(len(logs), 1)
+        self.assertEqual(logs.field_name, 'amount')
+        self.assertEqual(self.structure.audit_log_ids, logs)
+
+    def test_tracking_without_audit_mode(self):
+        self.flush_tracking()
+        tracking_count = self.tracking_value_count()
+
+        self.structure.with_context(school_audit_log=False).write({'amount': 1200.0})
+        self.flush_tracking()
+
+        self.assertEqual(self.tracking_value_count(), tracking_count + 1)
+        self.assertFalse(self.audit_logs())
+
+    def test_untracked_fields_are_not_audited(self):
+        self.structure.with_context(school_audit_log=True).write({'discount_value': 5.0})
+        self.assertFalse(self.audit_logs())
@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+
+from odoo import fields
+from odoo.addons.account.tests.common import AccountTestInvoicingCommon
+from odoo.tests import tagged
+from contextlib import contextmanager
+from datetime import timedelta
+from unittest.mock import patch
+import json
+import logging
+import os
+import time
+
+_logger = logging.getLogger(__name__)
+
+# Number of students seeded; the stored baseline only applies to its own size
+BENCHMARK_STUDENTS = int(os.environ.get('SCHOOL_BENCHMARK_STUDENTS', 200))
+
+# Allowed query count regression before a measure fails
+BENCHMARK_QUERY_TOLERANCE = 1.10
+BENCHMARK_QUERY_SLACK = 5
+
+BENCHMARK_BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'benchmark_baseline.json')
+
+
+@tagged('post_install', '-at_install', 'school_benchmark')
+class TestSchoolFeeBenchmark(AccountTestInvoicingCommon):
+    """
+    Benchmark of the module's hot paths, run before upgrades.
+
+    Seeds BENCHMARK_STUDENTS students with fee structures, then measures the
+    wall time and SQL query count of each operation. Results are logged and
+    the query counts are compared with benchmark_baseline.json: a measure
+    fails when its query count regresses beyond the tolerances. Measures
+    without a baseline entry are not compared and are listed in a warning.
+    Wall times depend on the machine and are only logged.
+
+    Run offline with:
+        odoo-bin -d <db> -i school_fee_management --test-tags school_benchmark --stop-after-init
+
+    Environment variables:
+    - SCHOOL_BENCHMARK_STUDENTS: number of seeded students (default 200);
+      query counts are only compared when it matches the baseline size
+    - SCHOOL_BENCHMARK_UPDATE_BASELINE=1: write the measures as new baseline
+      instead of comparing them
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.academic_year = '2024-2025'
+        cls.grades = ['grade_1', 'grade_2', 'grade_3', 'grade_4']
+
+        fee_types = cls.env['school.fee.type'].create([
+            {'name': 'Benchmark Tuition', 'code': 'BTUI'},
+            {'name': 'Benchmark Books', 'code': 'BBOOK'},
+        ])
+        cls.env['school.fee.structure'].create([{
+            'fee_type_id': fee_type.id,
+            'grade_level': grade,
+            'academic_year': cls.academic_year,
+            'amount': 1000.0,
+            'recurrence': 'semester',
+            'discount_type': 'percentage',
+            'discount_value': 5.0,
+        } for fee_type in fee_types for grade in cls.grades])
+
+        parents = cls.env['res.partner'].create([
+            {'name': f'Benchmark Parent {i}'} for i in range(BENCHMARK_STUDENTS // 2)
+        ])
+        cls.students = cls.env['res.partner'].create([{
+            'name': f'Benchmark Student {i}',
+            'is_student': True,
+            'student_id_number': f'BENCH{i:06d}',
+            'grade_level': cls.grades[i % len(cls.grades)],
+            'parent_id': parents[i % len(parents)].id,
+        } for i in range(BENCHMARK_STUDENTS)])
+
+        with open(BENCHMARK_BASELINE_PATH) as baseline_file:
+            cls.baseline = json.load(baseline_file)
+        cls.measures = {}
+        cls.unrecorded = []
+        cls.update_baseline = os.environ.get('SCHOOL_BENCHMARK_UPDATE_BASELINE') == '1'
+        if not cls.update_baseline and cls.baseline.get('students') != BENCHMARK_STUDENTS:
+            _logger.warning(
+                'Benchmark baseline recorded for %s students, running %s: query counts are NOT compared',
+                cls.baseline.get('students'), BENCHMARK_STUDENTS)
+
+    @classmethod
+    def tearDownClass(cls):
+        lines = [f'{name:<40} {m["queries"]:>8} queries {m["seconds"]:>9.3f}s'
+                 for name, m in sorted(cls.measures.items())]
+        _logger.info('School fee benchmark (%s students):\n%s', BENCHMARK_STUDENTS, '\n'.join(lines))
+        if cls.unrecorded:
+            _logger.warning(
+                'Benchmark measures without baseline, NOT compared: %s. '
+                'Record them with SCHOOL_BENCHMARK_UPDATE_BASELINE=1',
+                ', '.join(sorted(cls.unrecorded)))
+        if cls.update_baseline:
+            with open(BENCHMARK_BASELINE_PATH, 'w') as baseline_file:
+                json.dump({'students': BENCHMARK_STUDENTS, 'operations': cls.measures},
+                          baseline_file, indent=4, sort_keys=True)
+            _logger.info('Benchmark baseline written to %s', BENCHMARK_BASELINE_PATH)
+        super().tearDownClass()
+
+    @contextmanager
+    def measure(self, name):
+        """Measure wall time and query count of the block, flushes included"""
+        self.env.flush_all()
+        queries_before = self.env.cr.sql_log_count
+        started_at = time.perf_counter()
+        yield
+        self.env.flush_all()
+        measure = {
+            'queries': self.env.cr.sql_log_count - queries_before,
+            'seconds': round(time.perf_counter() - started_at, 3),
+        }
+        self.measures[name] = measure
+        self.assert_no_regression(name, measure)
+
+    def assert_no_regression(self, name, measure):
+        if self.update_baseline or self.baseline.get('students') != BENCHMARK_STUDENTS:
+            return
+        reference = self.baseline.get('operations', {}).get(name)
+        if not reference:
+            self.unrecorded.append(name)
+            return
+        max_queries = reference['queries'] * BENCHMARK_QUERY_TOLERANCE + BENCHMARK_QUERY_SLACK
+        self.assertLessEqual(
+            measure['queries'], max_queries,
+            f'{name}: {measure["queries"]} queries, baseline {reference["queries"]}')
+
+    def generate_invoices(self):
+        return self.env['school.student.invoice']._generate_semester_invoices(
+            self.students, 'fall', self.academic_year)
+
+    def post_invoices(self, overdue_ratio=0.5):
+        """Post the generated invoices, part of them already past due"""
+        invoices = self.env['school.student.invoice'].search([('student_id', 'in', self.students.ids)])
+        today = fields.Date.today()
+        overdue_count = int(len(invoices) * overdue_ratio)
+        invoices[:overdue_count].invoice_id.write({
+            'invoice_date': today - timedelta(days=75),
+            'invoice_date_due': today - timedelta(days=45),
+        })
+        invoices.invoice_id.action_post()
+        invoices.write({'state': 'sent'})
+        # Move changes reach the student invoices before commit
+        self.env.cr.flush()
+        return invoices
+
+    def create_transactions(self, invoices):
+        """
+        One partial payment per invoice. Amounts differ between invoices so
+        a payment applied to a sibling's invoice shows in the residuals.
+        """
+        return self.env['school.payment.transaction'].with_context(
+            tracking_disable=True, school_skip_transaction_chatter=True,
+        ).create([{
+            'student_invoice_id': invoice.id,
+            'payment_date': fields.Date.today(),
+            'amount': invoice.currency_id.round(invoice.amount_residual * (i % 3 + 1) / 4),
+            'currency_id': invoice.currency_id.id,
+            'payment_method': 'bank_transfer',
+        } for i, invoice in enumerate(invoices)])
+
+    def run_generation_cron(self):
+        """
+        Run the semester cron, then its worker jobs inline. The workers
+        commit per chunk, which a test transaction forbids: commit only
+        flushes here.
+        """
+        self.env['school.student.invoice'].cron_generate_semester_invoices('fall', self.academic_year)
+        with patch.object(type(self.env.cr), 'commit', lambda cr: cr.flush()):
+            self.env['school.invoice.generation.job'].cron_process_generation_jobs()
+
+    def test_01_generate_semester_invoices(self):
+        StudentInvoice = self.env['school.student.invoice']
+        domain = [('student_id', 'in', self.students.ids), ('semester', '=', 'fall')]
+
+        with self.measure('cron_generate_semester_invoices'):
+            self.run_generation_cron()
+        self.assertEqual(StudentInvoice.search_count(domain), BENCHMARK_STUDENTS)
+
+        with self.measure('cron_generate_semester_invoices_rerun'):
+            self.run_generation_cron()
+        self.assertEqual(StudentInvoice.search_count(domain), BENCHMARK_STUDENTS)
+
+    def test_02_update_overdue_status(self):
+        self.generate_invoices()
+        self.post_invoices()
+        with self.measure('auto_update_overdue_status'):
+            self.env['school.student.invoice'].auto_update_overdue_status()
+        overdue = self.env['school.student.invoice'].search_count([
+            ('student_id', 'in', self.students.ids), ('state', '=', 'overdue'),
+        ])
+        self.assertEqual(overdue, BENCHMARK_STUDENTS // 2)
+
+    def test_03_compute_total_outstanding(self):
+        self.generate_invoices()
+        self.post_invoices()
+        self.students.invalidate_recordset(['total_outstanding'])
+        with self.measure('compute_total_outstanding'):
+            self.students._compute_total_outstanding()
+        self.assertTrue(all(student.total_outstanding > 0 for student in self.students))
+
+    def test_04_confirm_and_reconcile_payments(self):
+        self.generate_invoices()
+        invoices = self.post_invoices(overdue_ratio=0)
+        transactions = self.create_transactions(invoices)
+        residuals_before = {invoice.id: invoice.invoice_id.amount_residual for invoice in invoices}
+
+        with self.measure('confirm_payments'):
+            transactions.action_confirm()
+        self.assertEqual(set(transactions.mapped('state')), {'confirmed'})
+
+        with self.measure('reconcile_payments'):
+            transactions.action_reconcile()
+        self.assertEqual(set(transactions.mapped('state')), {'reconciled'})
+        # Each payment is applied to its own invoice, never to a sibling's
+        for transaction in transactions:
+            move = transaction.student_invoice_id.invoice_id
+            self.assertEqual(transaction.account_payment_id.reconciled_invoice_ids, move)
+            self.assertAlmostEqual(
+                move.amount_residual, residuals_before[transaction.student_invoice_id.id] - transaction.amount,
+                places=2, msg=f'{move.name}: residual does not match its own payment')
+            self.assertNotEqual(move.payment_state, 'not_paid')
+
+        with self.measure('payment_collection_read_group'):
+            groups = self.env['school.payment.collection']._read_group(
+                [('academic_year', '=', self.academic_year)],
+                ['payment_method', 'grade_level'],
+                ['amount:sum', 'payment_count:sum'],
+            )
+        self.assertEqual(sum(count for _method, _grade, _amount, count in groups), len(transactions))
+
+    def test_05_report_read_group(self):
+        self.generate_invoices()
+        self.post_invoices()
+        self.env['school.student.invoice'].auto_update_overdue_status()
+
+        with self.measure('invoice_read_group'):
+            groups = self.env['school.student.invoice']._read_group(
+                [('student_id', 'in', self.students.ids)],
+                ['grade_level', 'state', 'aging_bucket'],
+                ['amount_total:sum', 'amount_residual:sum', '__count'],
+            )
+        self.assertTrue(groups)
+
+        with self.measure('revenue_summary_refresh'):
+            self.env['school.revenue.summary'].refresh_summary()
+
+        with self.measure('revenue_summary_read_group'):
+            groups = self.env['school.revenue.summary']._read_group(
+                [('academic_year', '=', self.academic_year)],
+                ['grade_level', 'state'],
+                ['amount_total:sum', 'amount_residual:sum', 'invoice_count:sum'],
+            )
+        self.assertGreaterEqual(sum(count for _grade, _state, _total, _residual, count in groups), BENCHMARK_STUDENTS)
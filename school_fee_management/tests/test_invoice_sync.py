@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+
+from odoo import fields
+from odoo.addons.account.tests.common import AccountTestInvoicingCommon
+from odoo.tests import tagged
+from unittest.mock import patch
+
+
+@tagged('post_install', '-at_install')
+class TestStudentInvoiceSync(AccountTestInvoicingCommon):
+    """Student invoices follow the payments of their accounting invoice"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.parent = cls.env['res.partner'].create({'name': 'Sync Parent'})
+        cls.student = cls.env['res.partner'].create({
+            'name': 'Sync Student',
+            'is_student': True,
+            'student_id_number': 'SYNC000001',
+            'grade_level': 'grade_1',
+            'parent_id': cls.parent.id,
+        })
+
+    def create_student_invoice(self, amount=1000.0):
+        move = self.init_invoice(
+            'out_invoice', partner=self.parent, invoice_date=fields.Date.today(),
+            amounts=[amount], post=True)
+        return self.env['school.student.invoice'].create({
+            'student_id': self.student.id,
+            'invoice_id': move.id,
+            'semester': 'fall',
+            'state': 'sent',
+        })
+
+    def register_payment(self, move, amount):
+        return self.env['account.payment.register'].with_context(
+            active_model='account.move', active_ids=move.ids,
+        ).create({'amount': amount})._create_payments()
+
+    def test_reconcile_and_unreconcile_from_widget(self):
+        student_invoice = self.create_student_invoice()
+        move = student_invoice.invoice_id
+
+        self.register_payment(move, 400.0)
+        self.assertEqual(student_invoice.state, 'partial')
+
+        self.register_payment(move, 600.0)
+        self.assertEqual(student_invoice.state, 'paid')
+
+        # Remove both payments the way the invoice widget does
+        for partial in move.line_ids.matched_credit_ids:
+            move.js_remove_outstanding_partial(partial.id)
+        self.assertEqual(move.payment_state, 'not_paid')
+        self.assertEqual(student_invoice.state, 'sent')
+
+    def test_accounting_values_follow_reconciliation(self):
+        StudentInvoice = self.env['school.student.invoice']
+        student_invoice = self.create_student_invoice()
+        move = student_invoice.invoice_id
+        self.env.flush_all()
+        self.env.cr.execute("""
+            UPDATE school_student_invoice SET write_date = '2000-01-01' WHERE id = %s
+        """, [student_invoice.id])
+        student_invoice.invalidate_recordset(['write_date'])
+
+        self.register_payment(move, 400.0)
+        # Refreshed once, when the transaction is flushed before commit
+        self.assertEqual(student_invoice.amount_residual, 1000.0)
+        self.env.cr.flush()
+        self.assertEqual(student_invoice.amount_residual, 600.0)
+        self.assertAlmostEqual(student_invoice.payment_percentage, 40.0)
+        self.assertIn(student_invoice, StudentInvoice.search([('amount_residual', '=', 600.0)]))
+        # write_date is bumped by the refresh (portal ETags, PDF cache key)
+        self.assertGreater(student_invoice.write_date, fields.Datetime.to_datetime('2000-01-01'))
+        self.assertEqual(StudentInvoice.cron_check_move_field_drift(), 0)
+
+        # Values changed behind the ORM are reported, then fixed
+        self.env.cr.execute("""
+            UPDATE school_student_invoice SET amount_residual = 1.0 WHERE id = %s
+        """, [student_invoice.id])
+        student_invoice.invalidate_recordset(['amount_residual'])
+        self.assertEqual(StudentInvoice.cron_check_move_field_drift(), 1)
+        StudentInvoice.cron_check_move_field_drift(fix=True)
+        self.assertEqual(student_invoice.amount_residual, 600.0)
+        self.assertEqual(StudentInvoice.cron_check_move_field_drift(), 0)
+
+    def test_cron_sync_mode(self):
+        StudentInvoice = self.env['school.student.invoice']
+        self.env['ir.config_parameter'].sudo().set_param('school_fee_management.move_sync_mode', 'cron')
+        student_invoice = self.create_student_invoice()
+
+        self.register_payment(student_invoice.invoice_id, 400.0)
+        self.env.cr.flush()
+        self.assertTrue(student_invoice.move_sync_pending)
+        self.assertEqual(student_invoice.amount_residual, 1000.0)
+        # Pending invoices are not drift
+        self.assertEqual(StudentInvoice.cron_check_move_field_drift(), 0)
+
+        with patch.object(type(self.env.cr), 'commit', lambda cr: cr.flush()):
+            StudentInvoice.cron_sync_move_fields()
+        self.assertFalse(student_invoice.move_sync_pending)
+        self.assertEqual(student_invoice.amount_residual, 600.0)
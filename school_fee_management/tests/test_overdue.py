@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+
+from odoo import fields
+from odoo.addons.account.tests.common import AccountTestInvoicingCommon
+from odoo.tests import tagged
+from datetime import timedelta
+
+
+@tagged('post_install', '-at_install')
+class TestOverdueStatus(AccountTestInvoicingCommon):
+    """Daily overdue cron, in SQL and ORM mode"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.parent = cls.env['res.partner'].create({'name': 'Overdue Parent'})
+        cls.students = cls.env['res.partner'].create([{
+            'name': f'Overdue Student {i}',
+            'is_student': True,
+            'student_id_number': f'OVER{i:06d}',
+            'grade_level': 'grade_2',
+            'parent_id': cls.parent.id,
+        } for i in range(3)])
+        cls.today = fields.Date.today()
+
+    def create_student_invoice(self, student, days_past_due, state='sent'):
+        due_date = self.today - timedelta(days=days_past_due)
+        move = self.init_invoice(
+            'out_invoice', partner=self.parent, invoice_date=due_date - timedelta(days=30), amounts=[1000.0])
+        move.invoice_date_due = due_date
+        move.action_post()
+        return self.env['school.student.invoice'].create({
+            'student_id': student.id,
+            'invoice_id': move.id,
+            'semester': 'fall',
+            'state': state,
+        })
+
+    def channel_message_count(self):
+        channel = self.env.ref('school_fee_management.channel_school_finance')
+        return self.env['mail.message'].search_count([('model', '=', 'discuss.channel'), ('res_id', '=', channel.id)])
+
+    def assert_overdue_run(self, use_sql):
+        late = self.create_student_invoice(self.students[0], days_past_due=10)
+        not_due = self.create_student_invoice(self.students[1], days_past_due=-10)
+        draft = self.create_student_invoice(self.students[2], days_past_due=10, state='draft')
+        messages_before = self.channel_message_count()
+
+        self.env['school.student.invoice'].auto_update_overdue_status(use_sql=use_sql)
+
+        self.assertEqual(late.state, 'overdue')
+        self.assertEqual(not_due.state, 'sent')
+        self.assertEqual(draft.state, 'draft')
+        # One summary for the whole run
+        self.assertEqual(self.channel_message_count(), messages_before + 1)
+
+    def test_overdue_sql_mode(self):
+        self.assert_overdue_run(use_sql=True)
+
+    def test_overdue_orm_mode(self):
+        self.assert_overdue_run(use_sql=False)
+
+    def test_overdue_sql_mode_audit(self):
+        late = self.create_student_invoice(self.students[0], days_past_due=10)
+        self.env['school.student.invoice'].with_context(school_audit_log=True).auto_update_overdue_status()
+        log = self.env['school.audit.log'].search([
+            ('model', '=', 'school.student.invoice'), ('res_id', '=', late.id), ('field_name', '=', 'state'),
+        ])
+        self.assertEqual(len(log), 1)
+        self.assertEqual((log.old_value, log.new_value), ('Sent', 'Overdue'))
+
+    def test_overdue_fields_and_aging(self):
+        StudentInvoice = self.env['school.student.invoice']
+        late = self.create_student_invoice(self.students[0], days_past_due=45)
+        not_due = self.create_student_invoice(self.students[1], days_past_due=-10)
+        self.assertEqual((late.is_overdue, late.days_overdue, late.aging_bucket), (True, 45, '31_60'))
+        self.assertEqual((not_due.is_overdue, not_due.days_overdue, not_due.aging_bucket), (False, 0, 'current'))
+
+        # Values stored on an earlier day are brought up to date by the cron
+        self.env.flush_all()
+        self.env.cr.execute("""
+            UPDATE school_student_invoice
+               SET is_overdue = (id = %(late)s), days_overdue = 1, aging_bucket = '0_30'
+             WHERE id IN %(ids)s
+        """, {'late': late.id, 'ids': (late.id, not_due.id)})
+        StudentInvoice.invalidate_model(['is_overdue', 'days_overdue', 'aging_bucket'])
+
+        StudentInvoice.auto_update_overdue_status()
+        self.assertEqual((late.is_overdue, late.days_overdue, late.aging_bucket), (True, 45, '31_60'))
+        self.assertEqual((not_due.is_overdue, not_due.days_overdue, not_due.aging_bucket), (False, 0, 'current'))
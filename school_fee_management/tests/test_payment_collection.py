@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+
+from odoo.addons.account.tests.common import AccountTestInvoicingCommon
+from odoo.tests import tagged
+from datetime import date
+
+ACADEMIC_YEAR = '2024-2025'
+PAYMENT_DATE = date(2024, 10, 15)
+
+
+@tagged('post_install', '-at_install')
+class TestPaymentCollection(AccountTestInvoicingCommon):
+    """The daily collection rollup follows the transactions by signed deltas"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        parent = cls.env['res.partner'].create({'name': 'Collection Parent'})
+        student = cls.env['res.partner'].create({
+            'name': 'Collection Student',
+            'is_student': True,
+            'student_id_number': 'COLL000001',
+            'grade_level': 'grade_6',
+            'parent_id': parent.id,
+        })
+        move = cls.init_invoice(
+            'out_invoice', partner=parent, invoice_date=date(2024, 10, 1), amounts=[1000.0], post=True)
+        cls.student_invoice = cls.env['school.student.invoice'].create({
+            'student_id': student.id,
+            'invoice_id': move.id,
+            'semester': 'fall',
+            'academic_year': ACADEMIC_YEAR,
+            'state': 'sent',
+        })
+
+    def create_transaction(self, amount, payment_method='bank_transfer'):
+        return self.env['school.payment.transaction'].create({
+            'student_invoice_id': self.student_invoice.id,
+            'payment_date': PAYMENT_DATE,
+            'amount': amount,
+            'currency_id': self.student_invoice.currency_id.id,
+            'payment_method': payment_method,
+        })
+
+    def collections(self):
+        """{payment method: (amount, payment count)} of the test day"""
+        rows = self.env['school.payment.collection'].search([
+            ('date', '=', PAYMENT_DATE),
+            ('grade_level', '=', 'grade_6'),
+            ('academic_year', '=', ACADEMIC_YEAR),
+        ])
+        return {row.payment_method: (row.amount, row.payment_count) for row in rows}
+
+    def test_collection_deltas(self):
+        transfers = self.create_transaction(100.0) | self.create_transaction(250.0)
+        # Draft payments are not collected
+        self.assertEqual(self.collections(), {})
+
+        transfers.action_confirm()
+        self.assertEqual(self.collections(), {'bank_transfer': (350.0, 2)})
+
+        # Reconciling a confirmed payment does not change the collected cash
+        transfers[0].action_reconcile()
+        self.assertEqual(transfers[0].state, 'reconciled')
+        self.assertEqual(self.collections(), {'bank_transfer': (350.0, 2)})
+
+        transfers[1].action_cancel()
+        self.assertEqual(self.collections(), {'bank_transfer': (100.0, 1)})
+
+        cash = self.create_transaction(50.0, payment_method='cash')
+        cash.action_confirm()
+        cash.write({'amount': 80.0})
+        self.assertEqual(self.collections(), {'bank_transfer': (100.0, 1), 'cash': (80.0, 1)})
+
+        # A row without payments left is removed
+        cash.action_cancel()
+        self.assertEqual(self.collections(), {'bank_transfer': (100.0, 1)})
+
+    def test_rebuild_matches_deltas(self):
+        transactions = self.create_transaction(100.0) | self.create_transaction(40.0, payment_method='cash')
+        transactions.action_confirm()
+        incremental = self.collections()
+
+        self.env['school.payment.collection'].cron_rebuild_collections()
+        self.assertEqual(self.collections(), incremental)
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+
+from odoo import fields
+from odoo.addons.account.tests.common import AccountTestInvoicingCommon
+from odoo.tests import tagged
+from datetime import date
+import base64
+
+
+@tagged('post_install', '-at_install')
+class TestPaymentImport(AccountTestInvoicingCommon):
+    """Statement lines are validated, then matched to open student invoices"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.parent = cls.env['res.partner'].create({'name': 'Import Parent'})
+        cls.students = cls.env['res.partner'].create([{
+            'name': f'Import Student {i}',
+            'is_student': True,
+            'student_id_number': f'IMPT{i:06d}',
+            'grade_level': 'grade_1',
+            'parent_id': cls.parent.id,
+        } for i in range(2)])
+        cls.invoices = cls.env['school.student.invoice']
+        for student in cls.students:
+            move = cls.init_invoice(
+                'out_invoice', partner=cls.parent, invoice_date=date(2024, 9, 1), amounts=[1000.0], post=True)
+            cls.invoices |= cls.env['school.student.invoice'].create({
+                'student_id': student.id,
+                'invoice_id': move.id,
+                'semester': 'fall',
+                'state': 'sent',
+            })
+
+    def run_import(self, content, **vals):
+        wizard = self.env['school.payment.import'].create({
+            'statement_file': base64.b64encode(content.encode()),
+            'filename': 'statement.csv',
+            **vals,
+        })
+        wizard.action_import()
+        return wizard
+
+    def transactions(self, invoice):
+        return self.env['school.payment.transaction'].search([('student_invoice_id', '=', invoice.id)])
+
+    def test_csv_lines_are_matched(self):
+        by_reference, by_student = self.invoices
+        wizard = self.run_import(
+            'date,amount,reference,student_id\n'
+            f'2024-09-10,250.00,{by_reference.invoice_id.name},\n'
+            f'2024-09-11,"1,000.00",school fees {by_student.student_id.student_id_number},\n'
+            '2024-09-12,80.00,UNKNOWN REF,\n'
+        )
+        self.assertEqual((wizard.line_count, wizard.imported_count, wizard.unmatched_count), (3, 2, 1))
+        self.assertRecordValues(self.transactions(by_reference), [{'amount': 250.0, 'payment_date': date(2024, 9, 10)}])
+        self.assertRecordValues(self.transactions(by_student), [{'amount': 1000.0, 'payment_date': date(2024, 9, 11)}])
+        self.assertIn('UNKNOWN REF', wizard.import_log)
+
+    def test_invalid_lines_are_rejected_before_matching(self):
+        reference = self.invoices[0].invoice_id.name
+        wizard = self.run_import(
+            'date,amount,reference\n'
+            f'2024-09-10,0.00,{reference}\n'
+            f'2024-09-10,-50.00,{reference}\n'
+            f'2024-09-10,abc,{reference}\n'
+            f'10/09/2024,50.00,{reference}\n'
+        )
+        self.assertEqual((wizard.imported_count, wizard.unmatched_count, wizard.rejected_count), (0, 0, 4))
+        log = wizard.import_log.splitlines()
+        self.assertIn('Line 2: amount must be positive', log[0])
+        self.assertIn('Line 3: amount must be positive', log[1])
+        self.assertIn('Line 4: invalid amount', log[2])
+        self.assertIn('Line 5: invalid date "10/09/2024", expected YYYY-MM-DD', log[3])
+        self.assertFalse(self.transactions(self.invoices[0]))
+
+    def test_csv_date_format(self):
+        invoice = self.invoices[0]
+        wizard = self.run_import(
+            'date,amount,reference\n'
+            f'10/09/2024,"50,00",{invoice.invoice_id.name}\n',
+            date_format='%d/%m/%Y', decimal_separator=',',
+        )
+        self.assertEqual(wizard.imported_count, 1)
+        self.assertRecordValues(self.transactions(invoice), [{'amount': 50.0, 'payment_date': date(2024, 9, 10)}])
+
+    def test_camt_booking_date_time(self):
+        invoice = self.invoices[0]
+        wizard = self.run_import(
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<Document xmlns="urn:iso:std:iso:20022:tech:xsd:camt.053.001.02"><BkToCstmrStmt><Stmt>'
+            '<Ntry><Amt Ccy="USD">75.00</Amt><CdtDbtInd>CRDT</CdtDbtInd>'
+            '<BookgDt><DtTm>2024-09-12T10:15:00+02:00</DtTm></BookgDt>'
+            f'<NtryDtls><TxDtls><RmtInf><Ustrd>{invoice.invoice_id.name}</Ustrd></RmtInf></TxDtls></NtryDtls>'
+            '</Ntry>'
+            '</Stmt></BkToCstmrStmt></Document>',
+            file_format='camt', filename='statement.xml',
+        )
+        self.assertEqual(wizard.imported_count, 1)
+        self.assertRecordValues(self.transactions(invoice), [{'amount': 75.0, 'payment_date': date(2024, 9, 12)}])
+
+    def test_missing_date_defaults_to_today(self):
+        invoice = self.invoices[0]
+        self.run_import(f'date,amount,reference\n,20.00,{invoice.invoice_id.name}\n')
+        self.assertEqual(self.transactions(invoice).payment_date, fields.Date.context_today(invoice))
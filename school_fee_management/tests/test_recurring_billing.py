@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+
+from odoo import fields
+from odoo.tests import TransactionCase, tagged
+from odoo.tools import date_utils
+from unittest.mock import patch
+
+# Forced academic year: only the structures of this test are billed
+ACADEMIC_YEAR = '2091-2092'
+
+
+class InterruptedRun(Exception):
+    pass
+
+
+@tagged('post_install', '-at_install')
+class TestRecurringBilling(TransactionCase):
+    """Monthly and quarterly fees are billed once per period, resuming after an interruption"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        fee_types = cls.env['school.fee.type'].create([
+            {'name': 'Recurring Canteen', 'code': 'RCANT'},
+            {'name': 'Recurring Transport', 'code': 'RTRANS'},
+        ])
+        cls.structures = cls.env['school.fee.structure'].create([{
+            'fee_type_id': fee_type.id,
+            'grade_level': 'grade_11',
+            'academic_year': ACADEMIC_YEAR,
+            'amount': 100.0,
+            'recurrence': recurrence,
+        } for fee_type, recurrence in zip(fee_types, ['monthly', 'quarterly'])])
+        parent = cls.env['res.partner'].create({'name': 'Recurring Parent'})
+        cls.students = cls.env['res.partner'].create([{
+            'name': f'Recurring Student {i}',
+            'is_student': True,
+            'student_id_number': f'RECU{i:06d}',
+            'grade_level': 'grade_11',
+            'parent_id': parent.id,
+        } for i in range(3)])
+
+    def run_billing(self, commit=None, batch_size=500):
+        """Run the billing cron; its per-batch commits only flush here unless replaced"""
+        commit = commit or (lambda cr: cr.flush())
+        with patch.object(type(self.env.cr), 'commit', commit):
+            self.env['school.fee.billing.period'].cron_bill_recurring_fees(
+                academic_year=ACADEMIC_YEAR, batch_size=batch_size)
+
+    def invoice_count_by_student(self):
+        invoices = self.env['school.student.invoice'].search([('student_id', 'in', self.students.ids)])
+        return {student: len(invoices.filtered(lambda i: i.student_id == student)) for student in self.students}
+
+    def test_billed_once_per_period(self):
+        self.run_billing()
+        self.assertEqual(set(self.invoice_count_by_student().values()), {1})
+        invoice = self.env['school.student.invoice'].search([('student_id', '=', self.students[0].id)])
+        self.assertEqual(invoice.academic_year, ACADEMIC_YEAR)
+        self.assertEqual(len(invoice.invoice_id.invoice_line_ids), 2)
+
+        today = fields.Date.context_today(self.env['school.fee.billing.period'])
+        periods = self.env['school.fee.billing.period'].search([('student_id', 'in', self.students.ids)])
+        self.assertEqual(len(periods), 6)
+        self.assertEqual(
+            set(periods.filtered(lambda p: p.recurrence == 'monthly').mapped('last_period_start')),
+            {date_utils.start_of(today, 'month')})
+        self.assertEqual(
+            set(periods.filtered(lambda p: p.recurrence == 'quarterly').mapped('last_period_start')),
+            {date_utils.start_of(today, 'quarter')})
+
+        # Later runs of the same period bill nothing
+        self.run_billing()
+        self.assertEqual(set(self.invoice_count_by_student().values()), {1})
+
+    def test_interrupted_run_resumes(self):
+        def commit_then_crash(cr):
+            cr.flush()
+            raise InterruptedRun()
+
+        # Killed right after committing its first batch of one student
+        with self.assertRaises(InterruptedRun):
+            self.run_billing(commit=commit_then_crash, batch_size=1)
+        self.assertEqual(list(self.invoice_count_by_student().values()), [1, 0, 0])
+
+        # The next run only bills the remaining students
+        self.run_billing(batch_size=1)
+        self.assertEqual(list(self.invoice_count_by_student().values()), [1, 1, 1])
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+
+from odoo import fields
+from odoo.addons.account.tests.common import AccountTestInvoicingCommon
+from odoo.exceptions import ValidationError
+from odoo.tests import tagged
+from odoo.tools import mute_logger
+from psycopg2 import IntegrityError
+import importlib.util
+import os
+
+MIGRATION_PATH = os.path.join(os.path.dirname(__file__), '..', 'migrations', '18.0.1.1.0', 'pre-migrate.py')
+
+
+@tagged('post_install', '-at_install')
+class TestSemesterInvoiceUnique(AccountTestInvoicingCommon):
+    """One non-cancelled invoice per student, semester and academic year"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.parent = cls.env['res.partner'].create({'name': 'Unique Parent'})
+        cls.student = cls.env['res.partner'].create({
+            'name': 'Unique Student',
+            'is_student': True,
+            'student_id_number': 'UNIQ000001',
+            'grade_level': 'grade_1',
+            'parent_id': cls.parent.id,
+        })
+
+    def create_student_invoice(self, state='draft'):
+        move = self.init_invoice('out_invoice', partner=self.parent, invoice_date=fields.Date.today(), amounts=[1000.0])
+        return self.env['school.student.invoice'].create({
+            'student_id': self.student.id,
+            'invoice_id': move.id,
+            'semester': 'fall',
+            'academic_year': '2024-2025',
+            'state': state,
+        })
+
+    def test_duplicate_semester_invoice_rejected(self):
+        self.create_student_invoice()
+        with self.assertRaises((ValidationError, IntegrityError)), mute_logger('odoo.sql_db'):
+            self.create_student_invoice()
+
+    def test_cancelled_invoice_does_not_block(self):
+        first = self.create_student_invoice()
+        first.action_cancel()
+        second = self.create_student_invoice()
+        self.assertEqual(second.state, 'draft')
+
+    def test_invoiced_students_are_skipped(self):
+        StudentInvoice = self.env['school.student.invoice']
+        self.assertFalse(StudentInvoice._get_invoiced_student_ids(self.student.ids, 'fall', '2024-2025'))
+        self.create_student_invoice()
+        self.assertEqual(StudentInvoice._get_invoiced_student_ids(self.student.ids, 'fall', '2024-2025'),
+                         set(self.student.ids))
+        self.assertFalse(StudentInvoice._get_invoiced_student_ids(self.student.ids, 'spring', '2024-2025'))
+
+    def test_migration_cancels_duplicates(self):
+        StudentInvoice = self.env['school.student.invoice']
+        kept = self.create_student_invoice(state='sent')
+        duplicate_move = self.init_invoice('out_invoice', partner=self.parent, amounts=[1000.0])
+        self.env.flush_all()
+        cr = self.env.cr
+        # Databases upgraded from an earlier version have no index yet
+        cr.execute("DROP INDEX school_student_invoice_semester_unique")
+        cr.execute("""
+            INSERT INTO school_student_invoice (student_id, invoice_id, semester, academic_year, state)
+            VALUES (%s, %s, 'fall', '2024-2025', 'sent')
+         RETURNING id
+        """, [self.student.id, duplicate_move.id])
+        duplicate = StudentInvoice.browse(cr.fetchone()[0])
+
+        spec = importlib.util.spec_from_file_location('school_fee_management_pre_migrate', MIGRATION_PATH)
+        migration = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(migration)
+        with mute_logger(migration.__name__):
+            migration.migrate(cr, '18.0.1.0.0')
+        StudentInvoice.invalidate_model(['state'])
+
+        self.assertEqual(kept.state, 'sent')
+        self.assertEqual(duplicate.state, 'cancelled')
+        StudentInvoice.init()
+        cr.execute("SELECT 1 FROM pg_indexes WHERE indexname = 'school_student_invoice_semester_unique'")
+        self.assertTrue(cr.fetchone())
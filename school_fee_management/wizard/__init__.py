@@ -0,0 +1,4 @@
+# -*- coding: utf-8 -*-
+
+from . import payment_import
+from . import archive_academic_year
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError
+
+
+class ArchiveAcademicYear(models.TransientModel):
+    """
+    Move the closed invoices of an academic year to the history tables.
+
+    The year must be closed: no unfinished generation job, no open or
+    unpaid invoice and no pending payment. Paid and cancelled invoices are
+    then moved to the history tables.
+    """
+    _name = 'school.archive.academic.year'
+    _description = 'Archive Academic Year'
+
+    academic_year = fields.Char(string='Academic Year', required=True)
+
+    archivable_count = fields.Integer(string='Invoices to Archive', compute='_compute_counts')
+    open_count = fields.Integer(string='Invoices Kept Open', compute='_compute_counts')
+
+    state = fields.Selection([
+        ('draft', 'Draft'),
+        ('done', 'Done'),
+    ], default='draft')
+
+    archived_invoice_count = fields.Integer(string='Archived Invoices', readonly=True)
+    archived_transaction_count = fields.Integer(string='Archived Payments', readonly=True)
+
+    @api.depends('academic_year')
+    def _compute_counts(self):
+        History = self.env['school.student.invoice.history']
+        for wizard in self:
+            if not wizard.academic_year:
+                wizard.archivable_count = wizard.open_count = 0
+                continue
+            archivable = len(History._get_archivable_invoice_ids(wizard.academic_year))
+            total = self.env['school.student.invoice'].search_count([('academic_year', '=', wizard.academic_year)])
+            wizard.archivable_count = archivable
+            wizard.open_count = total - archivable
+
+    def action_archive(self):
+        self.ensure_one()
+        self.env['school.student.invoice.history']._check_academic_year_closed(self.academic_year)
+        if not self.archivable_count:
+            raise UserError(_('There are no closed invoices to archive for %s.') % self.academic_year)
+
+        stats = self.env['school.student.invoice.history']._archive_academic_year(self.academic_year)
+        self.write({
+            'state': 'done',
+            'archived_invoice_count': stats['invoices'],
+            'archived_transaction_count': stats['transactions'],
+        })
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': self._name,
+            'res_id': self.id,
+            'view_mode': 'form',
+            'target': 'new',
+        }
@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+{
+    'name': 'Sequence Block Reservation',
+    'version': '18.0.1.0.0',
+    'category': 'Hidden/Tools',
+    'summary': 'Reserve a block of sequence numbers in one statement for bulk creation',
+    'description': """
+        Adds ir.sequence._next_block_by_code(code, count), shared by the
+        modules creating records in batches (School Fee Management, App One).
+    """,
+    'author': 'Your Company',
+    'website': 'https://www.yourcompany.com',
+    'depends': [
+        'base',
+    ],
+    'data': [],
+    'installable': True,
+    'application': False,
+    'auto_install': False,
+    'license': 'LGPL-3',
+}
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, api
+
+
+class IrSequence(models.Model):
+    """
+    Extend ir.sequence with block reservation for bulk creation.
+
+    WHY?
+    - next_by_code() costs one round-trip per number
+    - Bulk imports reserve the whole block with a single statement
+
+    Used by school_fee_management (payment transactions) and app_one
+    (properties): one copy of the nextval() over generate_series() logic.
+    """
+    _inherit = 'ir.sequence'
+
+    @api.model
+    def _next_block_by_code(self, sequence_code, count):
+        """
+        Reserve `count` consecutive numbers of the sequence `sequence_code`.
+
+        - Standard sequences: one nextval() call over generate_series()
+        - No-gap sequences: the row is locked and moved forward once
+        - Date-range sequences depend on each record date and fall back to
+          one next number per record
+
+        Returns:
+            list of `count` formatted references, or False values when no
+            sequence exists (same contract as next_by_code)
+        """
+        if count <= 0:
+            return []
+        self.check_access('read')
+        company_id = self.env.company.id
+        sequence = self.search([
+            ('code', '=', sequence_code),
+            ('company_id', 'in', [company_id, False]),
+        ], order='company_id', limit=1)
+        if not sequence:
+            return [False] * count
+
+        sequence = sequence.sudo()
+        if sequence.use_date_range:
+            return [sequence._next() for _i in range(count)]
+
+        if sequence.implementation == 'standard':
+            self.env.cr.execute(
+                "SELECT nextval(%s) FROM generate_series(1, %s)",
+                ['ir_sequence_%03d' % sequence.id, count]
+            )
+            numbers = [row[0] for row in self.env.cr.fetchall()]
+        else:
+            self.env.cr.execute(
+                "SELECT number_next FROM ir_sequence WHERE id = %s FOR UPDATE NOWAIT",
+                [sequence.id]
+            )
+            number_next = self.env.cr.fetchone()[0]
+            self.env.cr.execute(
+                "UPDATE ir_sequence SET number_next = number_next + %s WHERE id = %s",
+                [sequence.number_increment * count, sequence.id]
+            )
+            sequence.invalidate_recordset(['number_next'])
+            numbers = [number_next + i * sequence.number_increment for i in range(count)]
+
+        return [sequence.get_next_char(number) for number in numbers]
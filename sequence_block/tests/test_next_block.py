@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+
+from odoo.tests import TransactionCase, tagged
+
+
+@tagged('post_install', '-at_install')
+class TestNextBlockByCode(TransactionCase):
+    """A block of numbers is the same as successive next_by_code() calls"""
+
+    def create_sequence(self, code, **vals):
+        return self.env['ir.sequence'].create({
+            'name': code,
+            'code': code,
+            'prefix': 'BLK/',
+            'padding': 4,
+            **vals,
+        })
+
+    def test_standard_sequence(self):
+        self.create_sequence('test.block.standard', implementation='standard')
+        IrSequence = self.env['ir.sequence']
+        self.assertEqual(IrSequence._next_block_by_code('test.block.standard', 3),
+                         ['BLK/0001', 'BLK/0002', 'BLK/0003'])
+        self.assertEqual(IrSequence.next_by_code('test.block.standard'), 'BLK/0004')
+
+    def test_no_gap_sequence(self):
+        sequence = self.create_sequence('test.block.no_gap', implementation='no_gap', number_increment=2)
+        IrSequence = self.env['ir.sequence']
+        self.assertEqual(IrSequence._next_block_by_code('test.block.no_gap', 2), ['BLK/0001', 'BLK/0003'])
+        self.assertEqual(sequence.number_next, 5)
+        self.assertEqual(IrSequence.next_by_code('test.block.no_gap'), 'BLK/0005')
+
+    def test_date_range_sequence(self):
+        self.create_sequence('test.block.range', use_date_range=True, prefix='BLK/%(range_year)s/')
+        refs = self.env['ir.sequence']._next_block_by_code('test.block.range', 2)
+        self.assertEqual(len(set(refs)), 2)
+        self.assertTrue(all(ref.startswith('BLK/') for ref in refs))
+
+    def test_unknown_code(self):
+        IrSequence = self.env['ir.sequence']
+        self.assertEqual(IrSequence._next_block_by_code('test.block.unknown', 2), [False, False])
+        self.assertEqual(IrSequence._next_block_by_code('test.block.unknown', 0), [])